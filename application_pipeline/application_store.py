@@ -0,0 +1,214 @@
+from common.utils import load_json_file
+from datetime import datetime
+import logging
+import sqlite3
+import json
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    applied_on TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_applied_on ON jobs (applied_on);
+
+CREATE TABLE IF NOT EXISTS email_contacts (
+    email TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    contacted_on TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS email_contacts_email ON email_contacts (email, contacted_on);
+CREATE INDEX IF NOT EXISTS email_contacts_job_id ON email_contacts (job_id);
+CREATE INDEX IF NOT EXISTS email_contacts_contacted_on ON email_contacts (contacted_on);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    updated_on TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scores (
+    resume_key TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    scored_on TEXT NOT NULL,
+    PRIMARY KEY (resume_key, job_id)
+);
+CREATE INDEX IF NOT EXISTS scores_scored_on ON scores (scored_on);
+
+CREATE TABLE IF NOT EXISTS cover_letters (
+    company TEXT NOT NULL,
+    resume TEXT NOT NULL,
+    jd_hash TEXT NOT NULL,
+    company_name TEXT NOT NULL,
+    position TEXT NOT NULL,
+    letter TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (company, resume, jd_hash)
+);
+CREATE INDEX IF NOT EXISTS cover_letters_created_at ON cover_letters (created_at);
+"""
+
+class ApplicationStore:
+    """
+    Application history in a sqlite database in wal mode, one small transaction per application or email
+    so a run never rewrites its whole history and a crash loses at most the write in progress.
+    Job records are stored as json next to the indexed columns, in the same shape as the old applied.json.
+    Jobs part way through the pipeline are checkpointed with what each stage produced until they are applied.
+    Scores of skipped jobs are remembered per set of resumes so a listing is not scored twice.
+    Generated cover letters are kept per company and resume so near identical postings can reuse them.
+    The connection is only used from the thread that created it, the pipeline's event loop.
+    """
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def is_empty(self):
+        return bool(self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM jobs) AND NOT EXISTS (SELECT 1 FROM email_contacts)").fetchone()[0])
+
+    def import_json(self, path):
+        """Copy an applied.json file into the store in a single transaction."""
+        applied = load_json_file(path)
+        if not applied:
+            return 0
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO jobs (job_id, applied_on, record) VALUES (?, ?, ?)",
+                [(str(job_id), record['applied_on'], json.dumps(record)) for job_id, record in applied.get('jobs', {}).items()]
+            )
+            # applied.json only kept the latest contact per email, so every job contacted gets that date
+            self.conn.executemany(
+                "INSERT INTO email_contacts (email, job_id, contacted_on) VALUES (?, ?, ?)",
+                [
+                    (email, str(job_id), history['last_contacted'])
+                    for email, history in applied.get('email_history', {}).items()
+                    for job_id in history.get('jobs_contacted', [])
+                ]
+            )
+
+        imported = len(applied.get('jobs', {}))
+        logging.info(f"Imported {imported} applications from {path} into {self.path}")
+        return imported
+
+    def has_applied(self, job_id):
+        return self.conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (str(job_id),)).fetchone() is not None
+
+    def add_application(self, job_id, record):
+        """Record an application and drop its checkpoint in the same transaction."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, applied_on, record) VALUES (?, ?, ?)",
+                (str(job_id), record['applied_on'], json.dumps(record))
+            )
+            self.conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (str(job_id),))
+
+    def save_checkpoint(self, job_id, stage, data):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, stage, updated_on, data) VALUES (?, ?, ?, ?)",
+                (str(job_id), stage, datetime.now().isoformat(), json.dumps(data))
+            )
+
+    def delete_checkpoint(self, job_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (str(job_id),))
+
+    def checkpoints(self):
+        """Yield (job_id, stage, data) of every job that was started but not yet applied to."""
+        for job_id, stage, data in self.conn.execute("SELECT job_id, stage, data FROM checkpoints ORDER BY updated_on").fetchall():
+            yield job_id, stage, json.loads(data)
+
+    def applications(self, since=None):
+        """Yield (job_id, record) of applications, optionally only those applied to on or after since."""
+        if since is None:
+            rows = self.conn.execute("SELECT job_id, record FROM jobs ORDER BY applied_on")
+        else:
+            rows = self.conn.execute("SELECT job_id, record FROM jobs WHERE applied_on >= ? ORDER BY applied_on", (since.isoformat(),))
+        for job_id, record in rows:
+            yield job_id, json.loads(record)
+
+    def record_contact(self, email, job_id, contacted_on=None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO email_contacts (email, job_id, contacted_on) VALUES (?, ?, ?)",
+                (email, str(job_id), (contacted_on or datetime.now()).isoformat())
+            )
+
+    def remembered_score(self, resume_key, job_id):
+        row = self.conn.execute("SELECT score FROM scores WHERE resume_key = ? AND job_id = ?", (resume_key, str(job_id))).fetchone()
+        return row[0] if row else None
+
+    def remember_scores(self, resume_key, scores):
+        """Store (job_id, score) pairs scored against resume_key in a single transaction."""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (resume_key, job_id, score, scored_on) VALUES (?, ?, ?, ?)",
+                [(resume_key, str(job_id), score, now) for job_id, score in scores]
+            )
+
+    def prune_scores(self, before):
+        """Forget scores of listings scored before before, they have aged out of the scrape window."""
+        with self.conn:
+            self.conn.execute("DELETE FROM scores WHERE scored_on < ?", (before.isoformat(),))
+
+    def cover_letters(self, company, resume, since):
+        """Yield the cover letters generated for company with resume on or after since, as dicts."""
+        rows = self.conn.execute(
+            "SELECT company_name, position, resume, jd_hash, letter, created_at FROM cover_letters "
+            "WHERE company = ? AND resume = ? AND created_at >= ?",
+            (company, resume, since.isoformat())
+        )
+        for company_name, position, resume, jd_hash, letter, created_at in rows:
+            yield {
+                'company': company_name,
+                'position': position,
+                'resume': resume,
+                'jd_hash': jd_hash,
+                'letter': letter,
+                'created_at': created_at,
+            }
+
+    def add_cover_letter(self, company, company_name, position, resume, jd_hash, letter):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cover_letters (company, resume, jd_hash, company_name, position, letter, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (company, resume, jd_hash, company_name, position, letter, datetime.now().isoformat())
+            )
+
+    def prune_cover_letters(self, before):
+        with self.conn:
+            self.conn.execute("DELETE FROM cover_letters WHERE created_at < ?", (before.isoformat(),))
+
+    def contacts(self, since):
+        """Yield (email, contacted_on) of every email contacted on or after since."""
+        for email, contacted_on in self.conn.execute("SELECT email, contacted_on FROM email_contacts WHERE contacted_on >= ?", (since.isoformat(),)):
+            yield email, datetime.fromisoformat(contacted_on)
+
+    def to_dict(self):
+        """The whole history in the applied.json shape, used by the dashboard and for exports."""
+        email_history = {}
+        for email, job_id, contacted_on in self.conn.execute("SELECT email, job_id, contacted_on FROM email_contacts ORDER BY contacted_on"):
+            history = email_history.setdefault(email, {'last_contacted': contacted_on, 'jobs_contacted': []})
+            history['last_contacted'] = contacted_on
+            history['jobs_contacted'].append(job_id)
+
+        return {'jobs': dict(self.applications()), 'email_history': email_history}
+
+    def close(self):
+        self.conn.close()
+
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import logging
+import heapq
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+# Free mail providers are shared by unrelated people, so they are only throttled per address
+PUBLIC_MAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'outlook.com', 'outlook.com.au', 'hotmail.com', 'hotmail.com.au',
+    'live.com', 'live.com.au', 'msn.com', 'yahoo.com', 'yahoo.com.au', 'icloud.com', 'me.com', 'aol.com',
+    'protonmail.com', 'proton.me', 'bigpond.com', 'bigpond.net.au', 'optusnet.com.au',
+}
+
+class ContactHistory:
+    """
+    In memory index of recently contacted addresses and their domains, each with its own cooldown.
+    Lookups are dict hits on parsed datetimes, and a min-heap of expiry times drops entries once their
+    cooldown has passed so a long running process only holds contacts that can still cause a skip.
+    """
+    def __init__(self, email_cooldown_days, domain_cooldown_days, exempt_domains=PUBLIC_MAIL_DOMAINS):
+        self.email_cooldown = timedelta(days=email_cooldown_days)
+        self.domain_cooldown = timedelta(days=domain_cooldown_days)
+        self.exempt_domains = exempt_domains
+        self.emails = {}
+        self.domains = {}
+        self._expiry = []
+
+    def __len__(self):
+        return len(self.emails)
+
+    @staticmethod
+    def normalize(email):
+        return email.strip().lower()
+
+    def domain(self, email):
+        """The throttled domain of an address, None for public mail providers or when domain throttling is off."""
+        domain = self.normalize(email).rpartition('@')[2]
+        if not domain or domain in self.exempt_domains or self.domain_cooldown <= timedelta(0):
+            return None
+        return domain
+
+    def keys(self, email):
+        """The address and, if it is throttled, its domain, used to reserve both while an email is being sent."""
+        domain = self.domain(email)
+        return [self.normalize(email)] + ([f"@{domain}"] if domain else [])
+
+    def add(self, email, contacted_on=None):
+        contacted_on = contacted_on or datetime.now()
+        self._add('email', self.normalize(email), contacted_on)
+        domain = self.domain(email)
+        if domain:
+            self._add('domain', domain, contacted_on)
+
+    def _index(self, kind):
+        return (self.emails, self.email_cooldown) if kind == 'email' else (self.domains, self.domain_cooldown)
+
+    def _add(self, kind, key, contacted_on):
+        index, cooldown = self._index(kind)
+        if key in index and index[key] >= contacted_on:
+            return
+        index[key] = contacted_on
+        heapq.heappush(self._expiry, (contacted_on + cooldown, kind, key))
+
+    def skip_reason(self, email, now=None):
+        """Why email should not be contacted yet, or None if it is free to contact."""
+        now = now or datetime.now()
+        self._expire(now)
+
+        last_contacted = self.emails.get(self.normalize(email))
+        if last_contacted:
+            return f"recently contacted {email} {(now - last_contacted).days} days ago"
+
+        domain = self.domain(email)
+        last_contacted = self.domains.get(domain) if domain else None
+        if last_contacted:
+            hours = (now - last_contacted).total_seconds() / 3600
+            return f"recently contacted someone at {domain} {hours:.0f} hours ago"
+
+        return None
+
+    def _expire(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, kind, key = heapq.heappop(self._expiry)
+            index, cooldown = self._index(kind)
+            # A newer contact pushed its own later expiry, only drop the entry once that has passed
+            if key in index and index[key] + cooldown <= now:
+                del index[key]
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import numpy as np
+import logging
+import re
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class CoverLetterCache:
+    """
+    Generated cover letters keyed by company and job description embedding, so a near-identical posting
+    from the same advertiser reuses an earlier letter with the position and company substituted locally.
+    Letters are kept in the application store, one row per letter, and embeddings are looked up from
+    the embedding store by each entry's jd_hash rather than stored twice.
+    """
+    def __init__(self, store, embedding_store, min_similarity, max_age_days):
+        self.store = store
+        self.embedding_store = embedding_store
+        self.min_similarity = min_similarity
+        self.max_age = timedelta(days=max_age_days)
+        self.store.prune_cover_letters(datetime.now() - self.max_age)
+
+    @staticmethod
+    def _company_key(company):
+        return re.sub(r'\s+', ' ', company or '').strip().lower()
+
+    @staticmethod
+    def _replace_phrase(text, old, new):
+        # Whole words only, so "Engineer" is not swapped inside "Engineering" or a company name inside another word
+        pattern = re.compile(rf"(?<!\w){re.escape(old)}(?!\w)")
+        return pattern.sub(lambda match: new, text)
+
+    def find(self, company, resume_hash, vector):
+        """Return the most similar cached entry for this company and resume, if it is above min_similarity."""
+        best_entry, best_similarity = None, self.min_similarity
+        for entry in self.store.cover_letters(self._company_key(company), resume_hash, datetime.now() - self.max_age):
+            cached_vector = self.embedding_store.get(entry['jd_hash'])
+            if cached_vector is None:
+                continue
+            similarity = float(np.dot(cached_vector, vector))
+            if similarity >= best_similarity:
+                best_entry, best_similarity = entry, similarity
+
+        return best_entry
+
+    def render(self, entry, position, company):
+        """Reuse a cached letter for a new posting by swapping in its position and company name."""
+        letter = entry['letter']
+        if entry['position'] and position:
+            letter = self._replace_phrase(letter, entry['position'], position)
+        if entry['company'] and company:
+            letter = self._replace_phrase(letter, entry['company'], company)
+        return letter
+
+    def add(self, company, position, resume_hash, jd_hash, letter):
+        self.store.add_cover_letter(self._company_key(company), company, position or '', resume_hash, jd_hash, letter)
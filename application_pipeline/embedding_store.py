@@ -0,0 +1,96 @@
+from common.utils import load_json_file
+from pathlib import Path
+import numpy as np
+import hashlib
+import logging
+import json
+import os
+import re
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class EmbeddingStore:
+    """
+    Persistent job description embeddings for one model, stored as an append-only float32 matrix
+    that is memory-mapped for reads, next to an append-only keys.txt holding the content hash of each row.
+    Adding embeddings only appends to both files, so the cost of a save does not grow with the store.
+    """
+    def __init__(self, store_dir, model_name):
+        self.model_name = model_name
+        self.store_dir = Path(store_dir) / re.sub(r'[^\w.-]', '_', model_name)
+        self.vectors_path = self.store_dir / "vectors.f32"
+        self.keys_path = self.store_dir / "keys.txt"
+        self.index_path = self.store_dir / "index.json"
+
+        index = load_json_file(self.index_path) if self.index_path.exists() else {}
+        self.dim = index.get('dim')
+        self._matrix = None
+
+        if self.keys_path.exists():
+            keys = self.keys_path.read_text().split()
+        else:
+            # Stores written before keys.txt kept the row index in index.json
+            keys = sorted(index.get('rows', {}), key=index.get('rows', {}).get)
+            if keys:
+                self._write_keys(keys)
+                self._write_index()
+
+        # A crash between the two appends leaves one file longer, drop the extra rows so both stay aligned
+        vector_rows = self.vectors_path.stat().st_size // (self.dim * 4) if self.vectors_path.exists() and self.dim else 0
+        if len(keys) != vector_rows:
+            logging.warning(f"Embedding store {self.store_dir} has {len(keys)} keys and {vector_rows} vectors, keeping the first {min(len(keys), vector_rows)}")
+            keys = keys[:vector_rows]
+            self._write_keys(keys)
+            if self.vectors_path.exists():
+                os.truncate(self.vectors_path, len(keys) * (self.dim or 0) * 4)
+        self.rows = {key: row for row, key in enumerate(keys)}
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors()[row])
+
+    def add(self, keys, vectors):
+        """Append new vectors, keys already in the store are ignored."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        os.makedirs(self.store_dir, exist_ok=True)
+        if not self.dim:
+            self.dim = vectors.shape[1]
+            self._write_index()
+
+        new_keys = []
+        with open(self.vectors_path, 'ab') as f:
+            for key, vector in zip(keys, vectors):
+                if key in self.rows:
+                    continue
+                f.write(vector.tobytes())
+                self.rows[key] = len(self.rows)
+                new_keys.append(key)
+        # Keys are appended after their vectors, a crash in between only loses rows nothing points to yet
+        if new_keys:
+            with open(self.keys_path, 'a') as f:
+                f.write("".join(f"{key}\n" for key in new_keys))
+
+    def _write_keys(self, keys):
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = self.keys_path.with_suffix(".tmp")
+        tmp_path.write_text("".join(f"{key}\n" for key in keys))
+        os.replace(tmp_path, self.keys_path)
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({'model': self.model_name, 'dim': self.dim}))
+        os.replace(tmp_path, self.index_path)
+
+    def _vectors(self):
+        # Remap only when rows were appended since the last read
+        if self._matrix is None or self._matrix.shape[0] < len(self.rows):
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(len(self.rows), self.dim))
+        return self._matrix
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import numpy as np
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class ApplicationIndex:
+    """
+    Vector index of the job description embeddings of every job applied to, used to catch reposted
+    listings and agency duplicates under new job ids. Vectors must be unit length so cosine distance is 1 - dot.
+    The default backend is brute force numpy, 'hnsw' uses an approximate hnswlib index as history grows.
+    """
+    def __init__(self, dim, max_distance, window_days, backend="numpy"):
+        self.dim = dim
+        self.max_distance = max_distance
+        self.window = timedelta(days=window_days)
+        self.job_ids = []
+        self.applied_on = []
+        # Rows past len(self) are spare capacity, the array doubles when full so adds stay amortised O(1)
+        self.vectors = np.empty((64, dim), dtype=np.float32)
+        self.hnsw = None
+
+        if backend == "hnsw":
+            try:
+                import hnswlib
+                self.hnsw = hnswlib.Index(space='cosine', dim=dim)
+                self.hnsw.init_index(max_elements=1024, ef_construction=200, M=16)
+                self.hnsw.set_ef(64)
+            except ImportError:
+                logging.warning("hnswlib is not installed, falling back to a brute force duplicate index")
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def add(self, job_id, vector, applied_on):
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, self.dim)
+        if self.hnsw is not None:
+            if len(self) == self.hnsw.get_max_elements():
+                self.hnsw.resize_index(len(self) * 2)
+            self.hnsw.add_items(vector, [len(self)])
+        else:
+            if len(self) == len(self.vectors):
+                grown = np.empty((len(self.vectors) * 2, self.dim), dtype=np.float32)
+                grown[:len(self)] = self.vectors
+                self.vectors = grown
+            self.vectors[len(self)] = vector
+
+        self.job_ids.append(job_id)
+        self.applied_on.append(applied_on)
+
+    def find_duplicate(self, vector):
+        """Return (job_id, distance) of the closest application within the time window and max distance, else None."""
+        if not len(self):
+            return None
+
+        cutoff = datetime.now() - self.window
+        for row, distance in self._nearest(np.asarray(vector, dtype=np.float32)):
+            if distance > self.max_distance:
+                break
+            if self.applied_on[row] >= cutoff:
+                return self.job_ids[row], distance
+
+        return None
+
+    def _nearest(self, vector, k=10):
+        """Yield (row, cosine distance) of the nearest applications, closest first."""
+        if self.hnsw is not None:
+            rows, distances = self.hnsw.knn_query(vector, k=min(k, len(self)))
+            yield from zip(rows[0].tolist(), distances[0].tolist())
+            return
+
+        distances = 1 - self.vectors[:len(self)] @ vector
+        for row in np.argsort(distances)[:k]:
+            yield int(row), float(distances[row])
@@ -1,139 +1,658 @@
-from common.utils import generate_cover_letter_pdf, load_json_file, write_json_file
-from sentence_transformers import SentenceTransformer
+from common.utils import generate_cover_letter_pdf, load_json_file
+from application_pipeline.application_store import ApplicationStore
+from application_pipeline.embedding_store import EmbeddingStore
+from application_pipeline.cover_letter_cache import CoverLetterCache
+from application_pipeline.contact_history import ContactHistory
+from application_pipeline.history_index import ApplicationIndex
+from application_pipeline.prefilter import LexicalPrefilter
+from common.rate_limiter import configure_rate_limiters, get_rate_limiter
+from common.metrics import METRICS
+from common.resume_cache import ResumeCache
+from integrations.cover_letter_validator import CoverLetterValidator
+from integrations.response_cache import ResponseCache
+from integrations.email_template import EmailTemplate
 from integrations.mail_handler import MailClient
 from integrations.seek_client import SeekClient
-from scipy.spatial.distance import cosine
+from scrapers.scrape_state import ScrapeState
+from scrapers.scrape_cache import ScrapeCache
+from scrapers.job_index import JobIndex
 from scrapers.scraper import JobScraper
-from integrations.agent import AIAgent
-from datetime import datetime
+from integrations.agent import AIAgent, OpenAiAgent
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
 import logging
-import time
+import threading
+import hashlib
+import asyncio
+import shutil
+import sys
+import os
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
 )
 
+# Checkpointed stages of a job in order, a job is only recorded as applied after the last one
+STAGES = ['scored', 'letter_generated', 'pdf_rendered', 'seek_submitted', 'emailed']
+
+class JobTask:
+    """A scraped job moving through the pipeline stages along with what each stage produced."""
+    def __init__(self, job, searchTerm):
+        self.job = job
+        self.job_id = job['id']
+        self.searchTerm = searchTerm
+        self.jd_text = None
+        self.jd_hash = None
+        self.lexical_score = None
+        self.embedding = None
+        self.score = None
+        self.resume = None
+        self.agent = None
+        self.cover_letter = None
+        self.cover_letter_path = None
+        self.email_body = None
+        self.applied_via_seek = False
+        self.emails_contacted = []
+        # Last checkpointed stage and how many runs have resumed this job
+        self.stage = None
+        self.attempts = 0
+
+    def reached(self, stage):
+        return self.stage is not None and STAGES.index(self.stage) >= STAGES.index(stage)
+
+    def checkpoint_data(self):
+        """Everything needed to resume the job in a later run without repeating llm work."""
+        job = dict(self.job)
+        if 'searchTerms' in job:
+            job['searchTerms'] = list(job['searchTerms'])
+        return {
+            'job': job,
+            'searchTerm': self.searchTerm,
+            'jd_hash': self.jd_hash,
+            'score': self.score,
+            'resume': self.resume.pdf_path,
+            'cover_letter': self.cover_letter,
+            'cover_letter_path': self.cover_letter_path,
+            'email_body': self.email_body,
+            'applied_via_seek': self.applied_via_seek,
+            'emails_contacted': self.emails_contacted,
+            'attempts': self.attempts,
+        }
+
+
 class ApplicationPipeline:
+    # Runs a checkpointed job is resumed before it is given up on
+    MAX_RESUME_ATTEMPTS = 3
+
     def __init__(self, run_config, args):
-        self.scraper = JobScraper(run_config)
+        # Replays run against a fixed input so incremental filtering is skipped
+        use_state = args.incremental and not args.replay
+        scrape_state = ScrapeState(args.scrape_state_path, run_config.get('dateRange', 31)) if use_state else None
+        scrape_cache = ScrapeCache(args.scrape_cache_dir, args.scrape_cache_ttl) if args.scrape_cache_ttl > 0 or args.replay else None
+        self.scraper = JobScraper(
+            run_config,
+            args.dataset_page_size,
+            scrape_state,
+            scrape_cache,
+            args.replay,
+            args.scrape_concurrency,
+            args.scrape_retries
+        )
         self.args = args
-        self.agent = AIAgent(args.first_name, args.model).agent
+        configure_rate_limiters(args)
+        self._agent = None
+        self.response_cache = None
+        self.email_template = None
+        self._email_template_lock = asyncio.Lock()
+        # One SeekClient is shared by every submit worker, its session and token renewal are not thread safe
+        self._seek_lock = asyncio.Lock()
         self.mail_client = MailClient(args.mail_protocol)
-        self.applied = self._load_applied(args.applied_path)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.encoded_resume_txt = self.model.encode(self.args.resume_txt, convert_to_numpy=True)
+        # Replays are dry runs, nothing is written to the store and only scraping and scoring run
+        self.store = self._load_applied(args.store_path, None if args.replay else args.applied_path)
+        if not args.replay:
+            # Listings older than the scrape window are never returned again, so neither are their scores needed
+            self.store.prune_scores(datetime.now() - timedelta(days=run_config.get('dateRange', 31)))
+        self.contact_history = self._load_contact_history()
+        self.contacts_in_flight = set()
+        self.resumes = self._load_resumes(args.resume_pdf_path)
+        # Remembered scores are only valid for the exact set of resumes they were scored against
+        self.resume_key = hashlib.sha256("".join(resume.file_hash for resume in self.resumes).encode()).hexdigest()
+        self.model_name = 'all-MiniLM-L6-v2'
+        self.embedding_store = EmbeddingStore(args.embedding_store_dir, self.model_name)
+        self.prefilter_config = load_json_file(args.prefilter_config) if args.prefilter_config else {}
+        self._prefilter = None
+        self._history_index = None
+        # Embeddings of matched jobs still in flight this run, by job id, kept apart from the applied history
+        self.reservations = {}
+        self.cover_letter_cache = None
+        self.cover_letter_validators = {}
+        if args.cover_letter_reuse_similarity > 0 and not args.replay:
+            self.cover_letter_cache = CoverLetterCache(
+                self.store,
+                self.embedding_store,
+                args.cover_letter_reuse_similarity,
+                args.cover_letter_cache_days
+            )
+        self.resumed_tasks = [] if args.replay else self._load_checkpoints()
+        # The model and resume embedding are loaded on first use so runs with nothing new to score stay fast
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._encoded_resumes = None
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            if self.args.llm_cache_path:
+                self.response_cache = ResponseCache(self.args.llm_cache_path, self.args.llm_cache_days, self.args.llm_cache_max_entries)
+            self._agent = AIAgent(self.args.first_name, self.args.model, self.response_cache).agent
+        return self._agent
+
+    @property
+    def prefilter(self):
+        if self._prefilter is None:
+            self._prefilter = LexicalPrefilter(self.prefilter_config, [resume.text for resume in self.resumes])
+        return self._prefilter
+
+    def history_index(self, dim):
+        """Index of the embeddings of jobs applied to within the duplicate window, built on first use."""
+        if self._history_index is None:
+            self._history_index = ApplicationIndex(dim, self.args.duplicate_distance, self.args.duplicate_window_days, self.args.duplicate_index)
+            cutoff = datetime.now() - self._history_index.window
+            for job_id, record in self.store.applications(since=cutoff):
+                vector = self.embedding_store.get(record['jd_hash']) if record.get('jd_hash') else None
+                if vector is not None:
+                    self._history_index.add(job_id, vector, datetime.fromisoformat(record['applied_on']))
+            logging.info(f"Built duplicate index over {len(self._history_index)} recent applications")
+        return self._history_index
+
+    def find_duplicate_application(self, task):
+        if self.args.duplicate_distance <= 0:
+            return None
+        return self.history_index(len(task.embedding)).find_duplicate(task.embedding)
+
+    def find_reserved_duplicate(self, task):
+        """Return (job_id, distance) of the closest job in flight this run within duplicate_distance, else None."""
+        if self.args.duplicate_distance <= 0 or not self.reservations:
+            return None
+
+        job_ids = list(self.reservations)
+        distances = 1 - np.stack([self.reservations[job_id] for job_id in job_ids]) @ task.embedding
+        closest = int(distances.argmin())
+        if distances[closest] > self.args.duplicate_distance:
+            return None
+        return job_ids[closest], float(distances[closest])
+
+    def release_reservation(self, task, applied_on=None):
+        """Drop a job's in-run reservation, moving it into the duplicate index if it was applied to."""
+        self.reservations.pop(task.job_id, None)
+        # An index that is not built yet picks the application up from the store when it is
+        if applied_on is not None and self._history_index is not None and task.embedding is not None:
+            self._history_index.add(task.job_id, task.embedding, applied_on)
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                logging.info(f"Loading {self.model_name} model")
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def encoded_resumes(self):
+        """Matrix of unit length resume embeddings, one row per resume."""
+        if self._encoded_resumes is None:
+            vectors = []
+            for resume in self.resumes:
+                vector = resume.embedding(self.model_name)
+                if vector is None:
+                    vector = self.model.encode(resume.text, convert_to_numpy=True, normalize_embeddings=True)
+                    resume.set_embedding(self.model_name, vector)
+                vectors.append(vector)
+            self._encoded_resumes = np.asarray(vectors, dtype=np.float32)
+        return self._encoded_resumes
 
-    def _load_applied(self, path):
-        applied = load_json_file(path)
-        if not applied:
-            return {'jobs': {}, 'email_history': {}}
-        
-        return applied
+    def _load_resumes(self, resume_path):
+        """Load a single resume pdf, or every pdf in a directory of targeted resumes."""
+        if os.path.isdir(resume_path):
+            pdf_paths = sorted(str(path) for path in Path(resume_path).glob("*.pdf"))
+        else:
+            pdf_paths = [resume_path]
 
-    def calculate_resume_jd_similarity(self, jd_text):
-        jd_vector = self.model.encode(jd_text, convert_to_numpy=True)
-        sim_score = 1 - cosine(self.encoded_resume_txt, jd_vector)
+        if not pdf_paths:
+            logging.error(f"No resume pdfs found in {resume_path}")
+            sys.exit(1)
 
-        return float(sim_score)
+        logging.info(f"Scoring jobs against {len(pdf_paths)} resume(s): {', '.join(os.path.basename(path) for path in pdf_paths)}")
+        return [ResumeCache(path) for path in pdf_paths]
+
+    def _load_applied(self, store_path, applied_path):
+        store = ApplicationStore(store_path)
+        # An existing applied.json is imported once, when the store is first created
+        if applied_path and Path(applied_path).exists() and store.is_empty():
+            store.import_json(applied_path)
+        return store
+
+    def _load_checkpoints(self):
+        """JobTasks for jobs an earlier run checkpointed but never finished, resumed from their last stage."""
+        resumes = {resume.pdf_path: resume for resume in self.resumes}
+        tasks = []
+        for job_id, stage, data in self.store.checkpoints():
+            resume = resumes.get(data['resume'])
+            if resume is None or data['attempts'] >= self.MAX_RESUME_ATTEMPTS:
+                reason = "its resume is no longer loaded" if resume is None else f"{data['attempts']} resumed runs"
+                logging.warning(f"Dropping checkpoint of job {job_id} at stage {stage} after {reason}")
+                self.store.delete_checkpoint(job_id)
+                continue
+
+            task = JobTask(data['job'], data['searchTerm'])
+            task.jd_hash = data['jd_hash']
+            task.embedding = self.embedding_store.get(task.jd_hash) if task.jd_hash else None
+            task.score = data['score']
+            task.resume = resume
+            task.cover_letter = data['cover_letter']
+            task.cover_letter_path = data['cover_letter_path']
+            task.email_body = data['email_body']
+            task.applied_via_seek = data['applied_via_seek']
+            task.emails_contacted = data['emails_contacted']
+            # Saved straight away so a job that keeps failing is dropped after MAX_RESUME_ATTEMPTS runs
+            task.attempts = data['attempts'] + 1
+            self._checkpoint(task, stage)
+            tasks.append(task)
+
+        if tasks:
+            logging.info(f"Resuming {len(tasks)} jobs from checkpoints")
+        return tasks
+
+    def _checkpoint(self, task, stage):
+        task.stage = stage
+        self.store.save_checkpoint(task.job_id, stage, task.checkpoint_data())
+
+    def _load_contact_history(self):
+        contact_history = ContactHistory(self.args.email_cooldown_days, self.args.domain_cooldown_days)
+        since = datetime.now() - max(contact_history.email_cooldown, contact_history.domain_cooldown)
+        for email, contacted_on in self.store.contacts(since):
+            contact_history.add(email, contacted_on)
+        return contact_history
+
+    def encode_job_descriptions(self, jd_texts):
+        return self.model.encode(
+            jd_texts,
+            batch_size=self.args.embedding_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+
+    async def embed_job_descriptions(self, tasks):
+        """Return a matrix of unit length embeddings for tasks, only running the model on text the store has never seen."""
+        vectors = [self.embedding_store.get(task.jd_hash) for task in tasks]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        if misses:
+            with METRICS.span('embed'):
+                encoded = await asyncio.to_thread(self.encode_job_descriptions, [tasks[i].jd_text for i in misses])
+            self.embedding_store.add([tasks[i].jd_hash for i in misses], encoded)
+            for i, vector in zip(misses, encoded):
+                vectors[i] = vector
+
+        logging.info(f"Embedded {len(tasks)} job descriptions, {len(tasks) - len(misses)} from the embedding store")
+        return np.stack(vectors)
 
     def should_skip_email(self, email):
-        if email in self.applied['email_history']:
-            last_contacted = datetime.fromisoformat(self.applied['email_history'][email]['last_contacted'])
-            days_since_contact = (datetime.now() - last_contacted).days
-            if days_since_contact < 7:
-                logging.info(f"Recently contacted {email} {days_since_contact} days ago, skipping.")    
-                return True
+        if any(key in self.contacts_in_flight for key in self.contact_history.keys(email)):
+            logging.info(f"Already contacting {email} or its domain for another job, skipping.")
+            METRICS.skip('email_in_flight')
+            return True
+        reason = self.contact_history.skip_reason(email)
+        if reason:
+            logging.info(f"{reason.capitalize()}, skipping.")
+            METRICS.skip('email_recently_contacted')
+            return True
         return False
 
     async def run(self):
-        logging.info("Scraping job listings...")
-        data = await self.scraper.scrape("websift/seek-job-scraper")
-        with SeekClient(self.mail_client) as seek_client:
-            for searchTerm, job_data in data.items():
-                if not job_data:
-                    logging.info(f'No jobs found for search term: {searchTerm}, exiting.')
+        """
+        Run scrape -> score -> generate -> submit as concurrent stages connected by bounded queues.
+        Each stage has its own worker count so a run is limited by the slowest upstream api
+        rather than the sum of every call's latency, and full queues push back on earlier stages.
+        """
+        generate_workers = self.args.generate_workers
+        if not self.args.use_openai and generate_workers > 1:
+            logging.warning("Meta ai does not support concurrent generation, using a single generate worker")
+            generate_workers = 1
+
+        score_queue = asyncio.Queue(self.args.queue_size)
+        generate_queue = asyncio.Queue(self.args.queue_size)
+        submit_queue = asyncio.Queue(self.args.queue_size)
+
+        try:
+            if self.args.replay:
+                # Matched jobs are only logged, no llm call, seek session or email is made for a replay
+                await asyncio.gather(
+                    self._scrape_stage(score_queue, self.args.score_workers),
+                    self._run_stage("score", self._score_jobs, score_queue, generate_queue, self.args.score_workers, 1),
+                    self._run_stage("replay", self._log_replay_match, generate_queue, None, 1, 0),
+                )
+                return
+
+            with SeekClient(self.mail_client) as seek_client:
+                self.seek_client = seek_client
+                await asyncio.gather(
+                    self._scrape_stage(score_queue, self.args.score_workers),
+                    self._run_stage("score", self._score_jobs, score_queue, generate_queue, self.args.score_workers, generate_workers),
+                    self._run_stage("generate", self._generate_cover_letter, generate_queue, submit_queue, generate_workers, self.args.submit_workers),
+                    self._run_stage("submit", self._submit_application, submit_queue, None, self.args.submit_workers, 0),
+                )
+
+            self.scraper.save_state()
+        finally:
+            # The async openai client's connections belong to this event loop, close them before it ends
+            if isinstance(self._agent, OpenAiAgent):
+                await self._agent.close()
+            if self.response_cache is not None:
+                self.response_cache.close()
+            # Written even when the run fails so regressions show up in the report
+            if self.args.report_path:
+                METRICS.write_report(self.args.report_path)
+            if self.args.prometheus_path:
+                METRICS.write_prometheus(self.args.prometheus_path)
+
+    async def _run_stage(self, name, handler, inbound, outbound, workers, next_workers):
+        """Process tasks from inbound with a pool of workers until every upstream worker has signalled it is done."""
+        async def worker():
+            while True:
+                task = await inbound.get()
+                if task is None:
+                    return
+                try:
+                    with METRICS.span(f"stage.{name}"):
+                        result = await handler(task)
+                except Exception as e:
+                    label = f"job {task.job_id}" if isinstance(task, JobTask) else f"batch of {len(task)} jobs"
+                    logging.error(f"Error in {name} stage for {label}: {e}")
+                    if isinstance(task, JobTask):
+                        self.release_reservation(task)
                     continue
-                logging.info(f"Found {len(job_data)} jobs for search term: {searchTerm}")
-
-                for job in job_data:
-                    try:
-                        job_id = job['id']
-                        logging.info(f"Processing job: {job_id}")
-                        if job_id in self.applied['jobs']:
-                            logging.info(f"Already applied to job {job_id}, skipping.")
-                            continue
-                        # Re init agent if using meta ai to avoid limit context window issues
-                        if not self.args.use_openai:
-                            self.agent = AIAgent(self.args.first_name).agent
-                        
-                        position = job.get('title', '')
-                        raw_content = job.get('content', {})
-                        job_description = raw_content.get('sections')
-                        if not job_description:
-                            logging.error("No job description found, unable to process job, skipping.")
-                            continue
-                        
-                        score = self.calculate_resume_jd_similarity(" ".join(job_description))
-                        if score < self.args.min_score:
-                            logging.info(f"Low similarity score {score} for job {job_id}, skipping.")
-                            continue
-                        
-                        seek_success = False
-                        email_success = False
-                        emails_contacted = []
-
-                        cover_letter = self.agent.prepare_cover_letter(job, self.args.resume_txt, self.args.australian_language)
-                        generate_cover_letter_pdf(cover_letter, self.args.cover_letter_path)
-
-                        # Skip over jobs that require questions to be answered
-                        if seek_client.is_logged_in and (not job['hasRoleRequirements'] and not job['isExternalApply']):
-                            success = seek_client.apply(job_id, resume_path=self.args.resume_pdf_path, cover_letter_path=self.args.cover_letter_path, show_recent_role=self.args.show_recent_role)
-                            if success:
-                                logging.info(f"successfully applied to job {job_id} via seek")
-                                seek_success = True
-
-                            
-                        for email in job['emails']:
-                            if self.should_skip_email(email):
-                                continue
-
-                            msg = self.agent.write_email_contents()
-
-                            success = self.mail_client.send_application(
-                                email,
-                                job,
-                                msg,
-                                self.args.resume_pdf_path,
-                                self.args.cover_letter_path
-                            )
-                            if success:
-                                email_success = True
-                                emails_contacted.append(email)
-                                if email in self.applied['email_history']:
-                                    self.applied['email_history'][email]['last_contacted'] = datetime.now().isoformat()
-                                    self.applied['email_history'][email]['jobs_contacted'].append(job_id)
-                                else:
-                                    self.applied['email_history'][email] = {
-                                        'last_contacted': datetime.now().isoformat(),
-                                        'jobs_contacted': [job_id]
-                                    }
-                        
-                        self.applied['jobs'][job_id] = {
-                            'applied_on': datetime.now().isoformat(),
-                            'similarity_score': score,
-                            'applied_via_seek': seek_success,
-                            'applied_via_email': email_success,
-                            'emails_contacted': emails_contacted,
-                            'position': position,
-                            'link': job.get('jobLink', '')
-                        }
-
-                        write_json_file(self.args.applied_path, self.applied)
-                    except Exception as e:
-                        logging.error(f"Error processing job application: {e}")
-
-                    # Wait 30sec to not overload api can be removed if using official apis
-                    if not self.args.use_openai:
-                        logging.info('sleeping')
-                        time.sleep(30)
\ No newline at end of file
+                if outbound is None or result is None:
+                    continue
+                # Batch stages return a list of tasks which are fanned out to the next stage individually
+                for next_task in (result if isinstance(result, list) else [result]):
+                    await outbound.put(next_task)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbound is not None:
+            for _ in range(next_workers):
+                await outbound.put(None)
+
+    async def _scrape_stage(self, outbound, next_workers):
+        logging.info("Scraping job listings...")
+        job_index = JobIndex()
+        try:
+            if self.resumed_tasks:
+                METRICS.count('jobs.resumed', len(self.resumed_tasks))
+                await outbound.put(self.resumed_tasks)
+            with METRICS.span('stage.scrape'):
+                async for searchTerm, scraped_jobs in self.scraper.scrape("websift/seek-job-scraper"):
+                    job_data = job_index.merge(searchTerm, scraped_jobs)
+                    # Listings already queued under another term are marked seen when that term's batch is scored
+                    unique_ids = {job['id'] for job in job_data}
+                    self.scraper.mark_seen(searchTerm, [job for job in scraped_jobs if job.get('id') not in unique_ids])
+                    logging.info(f"Fetched {len(scraped_jobs)} jobs for search term: {searchTerm}, {len(job_data)} not seen under another term")
+                    METRICS.count('jobs.scraped', len(scraped_jobs))
+                    METRICS.count('jobs.unique', len(job_data))
+                    if job_data:
+                        await outbound.put([JobTask(job, searchTerm) for job in job_data])
+            job_index.log_summary()
+        finally:
+            for _ in range(next_workers):
+                await outbound.put(None)
+
+    async def _score_jobs(self, tasks):
+        """Score a page of jobs in one batch and return the ones above min_score."""
+        matched, held_back = await self._score_batch(tasks)
+        # Only a batch that was scored, and its matches checkpointed, is left out of later incremental scrapes.
+        # Jobs held back behind a near duplicate still in flight are scraped again in case that application fails
+        held_back_ids = {task.job_id for task in held_back}
+        by_term = {}
+        for task in tasks:
+            if task.job_id in held_back_ids:
+                continue
+            by_term.setdefault(task.searchTerm, []).append(task.job)
+        for searchTerm, jobs in by_term.items():
+            self.scraper.mark_seen(searchTerm, jobs)
+        return matched
+
+    async def _score_batch(self, tasks):
+        # Jobs resumed from a checkpoint were scored in an earlier run
+        resumed = [task for task in tasks if task.stage]
+        if self.args.duplicate_distance > 0:
+            # Resumed jobs are in flight too, a repost of one waits until it has been applied to or given up on
+            self.reservations.update((task.job_id, task.embedding) for task in resumed if task.embedding is not None)
+        resumed_ids = {task.job_id for task in self.resumed_tasks}
+        candidates = []
+        for task in tasks:
+            if task.stage:
+                continue
+            job_id = task.job_id
+            logging.info(f"Processing job: {job_id}")
+            if self.store.has_applied(job_id):
+                logging.info(f"Already applied to job {job_id}, skipping.")
+                METRICS.skip('already_applied')
+                continue
+            if job_id in resumed_ids:
+                logging.info(f"Job {job_id} is being resumed from a checkpoint, skipping.")
+                METRICS.skip('resuming_checkpoint')
+                continue
+
+            # Jobs skipped in an earlier run against these resumes are not even re-hashed
+            remembered_score = self.store.remembered_score(self.resume_key, job_id)
+            if remembered_score is not None and remembered_score < self.args.min_score:
+                logging.info(f"Low similarity score {remembered_score} for job {job_id} in an earlier run, skipping.")
+                METRICS.skip('remembered_low_score')
+                continue
+
+            job_description = task.job.get('content', {}).get('sections')
+            if not job_description:
+                logging.error(f"No job description found for job {job_id}, unable to process job, skipping.")
+                METRICS.skip('no_description')
+                continue
+
+            task.jd_text = " ".join(job_description)
+            candidates.append(task)
+
+        # Jobs rejected by the cheap lexical checks never reach the model
+        candidates = self.prefilter.filter(candidates)
+        if not candidates:
+            return resumed, []
+
+        for task in candidates:
+            task.jd_hash = self.embedding_store.key(task.jd_text)
+
+        embeddings = await self.embed_job_descriptions(candidates)
+        # Embeddings are unit length so a single matrix-vector product gives every cosine similarity
+        resume_matrix = await asyncio.to_thread(lambda: self.encoded_resumes)
+        # One matrix product scores every job against every resume, each job keeps its best matching resume
+        score_matrix = embeddings @ resume_matrix.T
+        best_resumes = score_matrix.argmax(axis=1)
+        scores = score_matrix.max(axis=1)
+        passed = scores >= self.args.min_score
+        low_scores = []
+        for task, vector, best_resume, score, keep in zip(candidates, embeddings, best_resumes.tolist(), scores.tolist(), passed.tolist()):
+            task.score = score
+            task.embedding = vector
+            task.resume = self.resumes[best_resume]
+            if not keep:
+                logging.info(f"Low similarity score {score} for job {task.job_id}, skipping.")
+                METRICS.skip('low_score')
+                low_scores.append((task.job_id, score))
+
+        if not self.args.replay:
+            self.store.remember_scores(self.resume_key, low_scores)
+        METRICS.count('jobs.scored', len(candidates))
+        logging.info(f"Scored {len(candidates)} jobs, {int(passed.sum())} above min score {self.args.min_score}")
+
+        matched = []
+        held_back = []
+        for task, keep in zip(candidates, passed.tolist()):
+            if not keep:
+                continue
+            duplicate = self.find_duplicate_application(task)
+            if duplicate:
+                logging.info(f"Job {task.job_id} is a near duplicate of job {duplicate[0]} (distance {duplicate[1]:.3f}), skipping.")
+                METRICS.skip('duplicate')
+                continue
+            duplicate = self.find_reserved_duplicate(task)
+            if duplicate:
+                logging.info(f"Job {task.job_id} is a near duplicate of job {duplicate[0]} still in progress (distance {duplicate[1]:.3f}), holding it back.")
+                METRICS.skip('duplicate_in_progress')
+                held_back.append(task)
+                continue
+            if self.args.duplicate_distance > 0:
+                self.reservations[task.job_id] = task.embedding
+            if not self.args.replay:
+                self._checkpoint(task, 'scored')
+            METRICS.count('jobs.matched')
+            matched.append(task)
+
+        return resumed + matched, held_back
+
+    async def _log_replay_match(self, task):
+        logging.info(f"Replay: would apply to job {task.job_id} ({task.job.get('title', '')}) with resume {os.path.basename(task.resume.pdf_path)}, score {task.score:.3f}")
+        METRICS.count('jobs.replay_matched')
+
+    async def _generate_cover_letter(self, task):
+        # Use a fresh meta ai agent per job to avoid limit context window issues
+        task.agent = self.agent if self.args.use_openai else AIAgent(self.args.first_name).agent
+
+        if not task.reached('letter_generated'):
+            company = (task.job.get('companyProfile') or {}).get('name')
+            position = task.job.get('title', '')
+            cached = None
+            if self.cover_letter_cache and company and task.embedding is not None:
+                cached = self.cover_letter_cache.find(company, task.resume.file_hash, task.embedding)
+
+            task.cover_letter = None
+            if cached:
+                letter = self.cover_letter_cache.render(cached, position, company)
+                # The substitution can break a letter, e.g. a longer title pushing it over the word limit, so it is checked again
+                validator = self.cover_letter_validators.get(task.resume.file_hash) or \
+                    self.cover_letter_validators.setdefault(task.resume.file_hash, CoverLetterValidator(task.resume.text))
+                problems = validator.problems(letter)
+                if problems:
+                    logging.info(f"Not reusing cover letter written for {cached['position']} at {company} for job {task.job_id}: {' '.join(problems)}")
+                    METRICS.count('cover_letters.reuse_rejected')
+                else:
+                    logging.info(f"Reusing cover letter written for {cached['position']} at {company} for job {task.job_id}")
+                    task.cover_letter = letter
+                    METRICS.count('cover_letters.reused')
+
+            if task.cover_letter is None:
+                logging.info(f"Generating cover letter for job {task.job_id} using resume {os.path.basename(task.resume.pdf_path)}")
+                if not self.args.use_openai:
+                    await get_rate_limiter('meta').acquire()
+                task.cover_letter = await task.agent.prepare_cover_letter(task.job, task.resume.text, self.args.australian_language)
+                METRICS.count('cover_letters.generated')
+                if self.cover_letter_cache and company:
+                    self.cover_letter_cache.add(company, position, task.resume.file_hash, task.jd_hash, task.cover_letter)
+            self._checkpoint(task, 'letter_generated')
+
+        # The pdf is cheap to rebuild from the checkpointed letter if it was lost
+        if not task.reached('pdf_rendered') or not os.path.exists(task.cover_letter_path):
+            # Each job renders to its own directory as letters are generated concurrently, the file name is kept for attachments
+            cover_letter_dir = os.path.join(os.path.dirname(self.args.cover_letter_path), "cover_letters", str(task.job_id))
+            os.makedirs(cover_letter_dir, exist_ok=True)
+            task.cover_letter_path = os.path.join(cover_letter_dir, os.path.basename(self.args.cover_letter_path))
+            with METRICS.span('pdf.render'):
+                await asyncio.to_thread(generate_cover_letter_pdf, task.cover_letter, task.cover_letter_path)
+            if not task.reached('pdf_rendered'):
+                self._checkpoint(task, 'pdf_rendered')
+
+        return task
+
+    async def _get_email_template(self, agent):
+        """The recruiter email template, written by the llm the first time a job is emailed in this run."""
+        async with self._email_template_lock:
+            if self.email_template is None:
+                if not self.args.use_openai:
+                    await get_rate_limiter('meta').acquire()
+                self.email_template = EmailTemplate(await agent.write_email_contents())
+                METRICS.count('email_templates.generated')
+        return self.email_template
+
+    async def _submit_application(self, task):
+        job = task.job
+        job_id = task.job_id
+
+        retry_seek = False
+        # Skip over jobs that require questions to be answered
+        if not task.reached('seek_submitted'):
+            if self.seek_client.is_logged_in and (not job['hasRoleRequirements'] and not job['isExternalApply']):
+                async with self._seek_lock:
+                    success = await asyncio.to_thread(
+                        self.seek_client.apply,
+                        job_id,
+                        resume_path=task.resume.pdf_path,
+                        cover_letter_path=task.cover_letter_path,
+                        show_recent_role=self.args.show_recent_role
+                    )
+                if success:
+                    logging.info(f"successfully applied to job {job_id} via seek")
+                    task.applied_via_seek = True
+                    METRICS.count('applied_via_seek')
+                elif task.attempts < self.MAX_RESUME_ATTEMPTS - 1:
+                    # Left at pdf_rendered so the next run retries seek with the same letter, recruiters are still emailed now
+                    retry_seek = True
+            if not retry_seek:
+                self._checkpoint(task, 'seek_submitted')
+
+        for email in job['emails']:
+            if email in task.emails_contacted or self.should_skip_email(email):
+                continue
+
+            reserved = self.contact_history.keys(email)
+            self.contacts_in_flight.update(reserved)
+            try:
+                if task.email_body is None:
+                    email_template = await self._get_email_template(task.agent)
+                    task.email_body = email_template.render(job)
+                    self._checkpoint(task, task.stage)
+                success = await asyncio.to_thread(
+                    self.mail_client.send_application,
+                    email,
+                    job,
+                    task.email_body,
+                    task.resume.pdf_path,
+                    task.cover_letter_path
+                )
+            finally:
+                self.contacts_in_flight.difference_update(reserved)
+
+            if success:
+                task.emails_contacted.append(email)
+                METRICS.count('emails.sent')
+                self.store.record_contact(email, job_id)
+                self.contact_history.add(email)
+                self._checkpoint(task, task.stage)
+
+        if retry_seek:
+            raise RuntimeError(f"Seek application failed after emailing {len(task.emails_contacted)} recruiter(s), it will be retried next run")
+
+        # Recording the application also drops its checkpoint, the job has reached its last stage 'emailed'
+        task.stage = 'emailed'
+        applied_on = datetime.now()
+        self.store.add_application(job_id, {
+            'applied_on': applied_on.isoformat(),
+            'similarity_score': task.score,
+            'resume': os.path.basename(task.resume.pdf_path),
+            'jd_hash': task.jd_hash,
+            'applied_via_seek': task.applied_via_seek,
+            'applied_via_email': bool(task.emails_contacted),
+            'emails_contacted': task.emails_contacted,
+            'position': job.get('title', ''),
+            'link': job.get('jobLink', ''),
+            'search_terms': list(job.get('searchTerms', [task.searchTerm]))
+        })
+        METRICS.count('jobs.applied')
+        self.release_reservation(task, applied_on)
+        shutil.rmtree(os.path.dirname(task.cover_letter_path), ignore_errors=True)
@@ -0,0 +1,99 @@
+from common.metrics import METRICS
+from common.utils import tokenize
+from collections import Counter
+import logging
+import math
+import re
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class LexicalPrefilter:
+    """
+    Cheap checks run before a job is embedded or sent to an llm.
+    Title include/exclude patterns and required/banned keywords are case insensitive regexes,
+    minLexicalScore rejects jobs whose tf-idf cosine similarity to every resume is below it.
+    Document frequencies are accumulated over the job descriptions seen during the run.
+    """
+    def __init__(self, config, resume_texts):
+        self.title_include = self._compile(config.get('titleInclude', []))
+        self.title_exclude = self._compile(config.get('titleExclude', []))
+        self.required_keywords = self._compile(config.get('requiredKeywords', []))
+        self.banned_keywords = self._compile(config.get('bannedKeywords', []))
+        self.min_lexical_score = config.get('minLexicalScore', 0)
+
+        self.resume_counts = [Counter(tokenize(text)) for text in resume_texts] if self.min_lexical_score > 0 else []
+        self.doc_freq = Counter()
+        self.num_docs = 0
+
+    @staticmethod
+    def _compile(patterns):
+        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    def filter(self, tasks):
+        """Return the tasks that pass every check, logging why the others were rejected."""
+        token_counts = {}
+        passed = []
+        for task in tasks:
+            reason = self.reject_reason(task.job.get('title', ''), task.jd_text)
+            if reason:
+                logging.info(f"Prefilter rejected job {task.job_id}: {reason}, skipping.")
+                METRICS.skip('prefilter_title' if reason.startswith('title') else 'prefilter_keyword')
+                continue
+            passed.append(task)
+            if self.min_lexical_score > 0:
+                token_counts[task.job_id] = Counter(tokenize(task.jd_text))
+
+        if self.min_lexical_score <= 0 or not passed:
+            return passed
+
+        for counts in token_counts.values():
+            self.doc_freq.update(counts.keys())
+            self.num_docs += 1
+
+        resume_vectors = [self._tfidf(counts) for counts in self.resume_counts]
+        scored = []
+        for task in passed:
+            job_vector = self._tfidf(token_counts[task.job_id])
+            task.lexical_score = max((self._cosine(job_vector, resume_vector) for resume_vector in resume_vectors), default=0)
+            if task.lexical_score < self.min_lexical_score:
+                logging.info(f"Prefilter rejected job {task.job_id}: low lexical score {task.lexical_score:.3f}, skipping.")
+                METRICS.skip('low_lexical_score')
+                continue
+            scored.append(task)
+
+        return scored
+
+    def reject_reason(self, title, text):
+        if self.title_include and not any(pattern.search(title) for pattern in self.title_include):
+            return f"title '{title}' matches no include pattern"
+        for pattern in self.title_exclude:
+            if pattern.search(title):
+                return f"title '{title}' matches exclude pattern '{pattern.pattern}'"
+
+        searchable = f"{title} {text}"
+        for pattern in self.required_keywords:
+            if not pattern.search(searchable):
+                return f"missing required keyword '{pattern.pattern}'"
+        for pattern in self.banned_keywords:
+            if pattern.search(searchable):
+                return f"contains banned keyword '{pattern.pattern}'"
+
+        return None
+
+    def _tfidf(self, counts):
+        """Sparse sublinear tf-idf vector as a {token: weight} dict."""
+        return {
+            token: (1 + math.log(count)) * (math.log((1 + self.num_docs) / (1 + self.doc_freq[token])) + 1)
+            for token, count in counts.items()
+        }
+
+    @staticmethod
+    def _cosine(a, b):
+        if len(a) > len(b):
+            a, b = b, a
+        dot = sum(weight * b.get(token, 0) for token, weight in a.items())
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0
@@ -0,0 +1,256 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import socketserver
+import threading
+import logging
+import random
+import json
+import gzip
+import time
+import uuid
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+COVER_LETTER = """Dear Hiring Manager,
+
+I am excited to apply for this position. Over the last two years I have built and maintained REST APIs in Python with FastAPI and PostgreSQL, and I enjoy writing clean, well tested code that other developers can pick up easily.
+
+In my current role I containerised our services with Docker, deployed them to AWS and set up CI/CD pipelines that cut our release time in half. I have also worked closely with product and design in an agile team, reviewing pull requests and pairing on new features.
+
+I would welcome the opportunity to bring this experience to your team and to keep learning from experienced engineers.
+
+Sincerely,"""
+
+EMAIL_BODY = """Dear Hiring Manager,
+I came across your listing for the $position role at $company and would love to be considered. My resume and cover letter are attached.
+Best Regards
+Alex"""
+
+
+class FakeUpstreams:
+    """
+    Local stand-ins for the apify api, an openai compatible chat endpoint and seek's login/graphql/upload
+    endpoints, served from one threaded http server. Latencies are per request, throttle_rate is the
+    fraction of chat completions answered with a 429 and a Retry-After header.
+    """
+    def __init__(self, datasets, llm_latency=0.5, seek_latency=0.1, throttle_rate=0.0, seed=0):
+        # datasets maps each search term to its listings, runs and datasets are addressed by position
+        self.dataset_ids = {term: f"dataset-{i}" for i, term in enumerate(datasets)}
+        self.datasets = {self.dataset_ids[term]: items for term, items in datasets.items()}
+        self.llm_latency = llm_latency
+        self.seek_latency = seek_latency
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name):
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get('content-length') or 0)
+                body = self.rfile.read(length) if length else b''
+                # The apify client gzips request bodies
+                return gzip.decompress(body) if self.headers.get('content-encoding') == 'gzip' else body
+
+            def _send(self, status, payload=None, headers=None):
+                body = json.dumps(payload).encode() if payload is not None else b''
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                if parts[:2] == ['v2', 'actor-runs']:
+                    upstreams._count('apify.run')
+                    return self._send(200, {'data': upstreams._run(parts[2])})
+                if parts[:2] == ['v2', 'datasets'] and parts[3:] == ['items']:
+                    upstreams._count('apify.dataset_page')
+                    query = parse_qs(url.query)
+                    items = upstreams.datasets[parts[2]]
+                    offset = int(query.get('offset', [0])[0])
+                    limit = int(query.get('limit', [len(items)])[0])
+                    page = items[offset:offset + limit]
+                    return self._send(200, page, {
+                        'x-apify-pagination-total': len(items),
+                        'x-apify-pagination-offset': offset,
+                        'x-apify-pagination-limit': limit,
+                        'x-apify-pagination-count': len(page),
+                        'x-apify-pagination-desc': '',
+                    })
+                self._send(404, {'error': f'unknown path {url.path}'})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                body = self._body()
+                if parts[:2] == ['v2', 'acts'] and parts[-1] == 'runs':
+                    upstreams._count('apify.actor_run')
+                    run_input = json.loads(body or b'{}')
+                    return self._send(201, {'data': upstreams._run(upstreams.dataset_ids[run_input.get('searchTerm')])})
+                if url.path == '/v1/chat/completions':
+                    return self._chat(json.loads(body))
+                if url.path == '/oauth/token':
+                    upstreams._count('seek.oauth_token')
+                    return self._send(200, {'access_token': uuid.uuid4().hex, 'refresh_token': uuid.uuid4().hex, 'expires_in': 3600})
+                if url.path == '/graphql':
+                    time.sleep(upstreams.seek_latency)
+                    return self._graphql(json.loads(body))
+                if url.path == '/upload':
+                    upstreams._count('seek.upload')
+                    time.sleep(upstreams.seek_latency)
+                    return self._send(204)
+                self._send(404, {'error': f'unknown path {url.path}'})
+
+            def _chat(self, request):
+                upstreams._count('openai.chat')
+                with upstreams.lock:
+                    throttled = upstreams.rng.random() < upstreams.throttle_rate
+                if throttled:
+                    upstreams._count('openai.throttled')
+                    return self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}}, {'retry-after': 1})
+
+                time.sleep(upstreams.llm_latency)
+                prompt = " ".join(message['content'] for message in request['messages'])
+                content = EMAIL_BODY if 'cold email' in prompt else COVER_LETTER
+                prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+                self._send(200, {
+                    'id': f'chatcmpl-{uuid.uuid4().hex}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model') or 'benchmark',
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'total_tokens': prompt_tokens + completion_tokens},
+                }, {
+                    'x-ratelimit-limit-requests': 5000,
+                    'x-ratelimit-remaining-requests': 4999,
+                    'x-ratelimit-reset-requests': '12ms',
+                    'x-ratelimit-limit-tokens': 2000000,
+                    'x-ratelimit-remaining-tokens': 2000000 - prompt_tokens - completion_tokens,
+                    'x-ratelimit-reset-tokens': '6ms',
+                })
+
+            def _graphql(self, request):
+                operation = request[0]['operationName']
+                upstreams._count(f'seek.{operation}')
+                if operation == 'GetDocumentUploadData':
+                    data = {'viewer': {'documentUploadFormData': {
+                        'link': f'{upstreams.url}/upload',
+                        'key': str(uuid.uuid4()),
+                        'formFields': [{'key': 'key', 'value': 'uploads/${filename}'}],
+                    }}}
+                elif operation == 'ApplyProcessUploadedAttachment':
+                    data = {'processUploadedAttachment': {'uri': f'attachment://{uuid.uuid4()}'}}
+                elif operation == 'ApplyProcessUploadedResume':
+                    data = {'processUploadedResume': {'resume': {'fileMetadata': {'uri': f'resume://{uuid.uuid4()}'}}}}
+                elif operation == 'GetRoles':
+                    data = {'viewer': {'roles': []}}
+                elif operation == 'ApplySubmitApplication':
+                    data = {'submitApplication': {'__typename': 'SubmitApplicationSuccess', 'applicationId': str(uuid.uuid4())}}
+                else:
+                    return self._send(200, [{'errors': [{'message': f'unknown operation {operation}'}]}])
+                self._send(200, [{'data': data}])
+
+        return Handler
+
+    def _run(self, dataset_id):
+        # Every run has finished by the time it is returned and shares its id with its dataset
+        return {
+            'id': dataset_id,
+            'status': 'SUCCEEDED',
+            'defaultDatasetId': dataset_id,
+            'startedAt': None,
+            'finishedAt': None,
+        }
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Minimal smtp server that accepts any login and discards every message after counting it."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.messages = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 localhost benchmark smtp sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 SIZE 52428800")
+            elif command.startswith('AUTH'):
+                self.reply("235 2.7.0 Authentication successful")
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 OK queued")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
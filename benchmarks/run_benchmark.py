@@ -0,0 +1,160 @@
+"""
+End to end benchmark of ApplicationPipeline against local stand-ins for apify, openai, seek and smtp.
+Run from the repository root, any unrecognised arguments are passed through to the pipeline:
+    python -m benchmarks.run_benchmark --jobs 5000 --llm_latency 1.0 --generate_workers 8
+"""
+
+from benchmarks.fake_servers import FakeUpstreams, SmtpSink
+from benchmarks.synthetic_jobs import RESUME_TEXT, generate_jobs
+from common.utils import generate_cover_letter_pdf, load_json_file, write_json_file
+from common.profiling import peak_rss_mb
+from datetime import datetime
+import argparse
+import tempfile
+import logging
+import asyncio
+import shutil
+import time
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=1000, help='Number of synthetic listings across all search terms')
+    parser.add_argument('--search_terms', type=int, default=5, help='Number of search terms the listings are split across')
+    parser.add_argument('--relevant_fraction', type=float, default=0.3, help='Fraction of listings similar to the synthetic resume')
+    parser.add_argument('--email_fraction', type=float, default=0.3, help='Fraction of listings with a recruiter email')
+    parser.add_argument('--seek_fraction', type=float, default=0.5, help='Fraction of listings that can be applied to via seek')
+    parser.add_argument('--llm_latency', type=float, default=0.5, help='Seconds the fake openai endpoint takes per completion')
+    parser.add_argument('--seek_latency', type=float, default=0.1, help='Seconds the fake seek endpoints take per request')
+    parser.add_argument('--smtp_latency', type=float, default=0.05, help='Seconds the smtp sink takes per message')
+    parser.add_argument('--throttle_rate', type=float, default=0.0, help='Fraction of completions answered with a 429')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help='Result json path, defaults to benchmarks/results/<timestamp>.json')
+    parser.add_argument('--baseline', type=str, default=None, help='Earlier result json to compare against')
+    parser.add_argument('--keep', type=int, default=0, help='Keep the working directory of the run. 0 = False')
+    return parser.parse_known_args()
+
+
+async def run_pipeline(work_dir, resume_path, search_terms, pipeline_argv):
+    # Imported once the environment points every client at the local stand-ins
+    from application_pipeline import job_application_pipeline
+    from integrations.seek_client import SeekClient
+    from config.args import add_args
+
+    class BenchmarkSeekClient(SeekClient):
+        # The pipeline only applies via seek once logged in, the fake accepts any refresh token
+        def __enter__(self):
+            super().__enter__()
+            self.login()
+            return self
+
+    job_application_pipeline.SeekClient = BenchmarkSeekClient
+
+    args = add_args([
+        '--first_name', 'Alex',
+        '--resume_pdf_path', resume_path,
+        '--store_path', os.path.join(work_dir, 'applied.db'),
+        '--applied_path', os.path.join(work_dir, 'applied.json'),
+        '--embedding_store_dir', os.path.join(work_dir, 'embeddings'),
+        '--scrape_state_path', os.path.join(work_dir, 'scrape_state.json'),
+        '--scrape_cache_ttl', '0',
+        '--cover_letter_path', os.path.join(work_dir, 'cover_letter.pdf'),
+        '--report_path', os.path.join(work_dir, 'run_report.json'),
+        '--llm_cache_path', os.path.join(work_dir, 'llm_cache.db'),
+        '--model', 'benchmark',
+        *pipeline_argv,
+    ])
+    args.use_openai = True
+
+    pipeline = job_application_pipeline.ApplicationPipeline({'searchTerms': search_terms, 'dateRange': 31}, args)
+    started = time.perf_counter()
+    await pipeline.run()
+    return time.perf_counter() - started
+
+
+def compare(result, baseline):
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    logging.info(f"Compared to {baseline['finished_at']}: jobs/sec {result['jobs_per_second']:.1f} vs {baseline['jobs_per_second']:.1f} ({change(result['jobs_per_second'], baseline['jobs_per_second'])}), "
+                 f"peak rss {result['peak_rss_mb']:.0f} MB vs {baseline['peak_rss_mb']:.0f} MB")
+    for name, stage in result['stages'].items():
+        old = baseline['stages'].get(name)
+        if old:
+            logging.info(f"  {name:<40} p95 {stage['p95_seconds']:.4f}s vs {old['p95_seconds']:.4f}s ({change(stage['p95_seconds'], old['p95_seconds'])})")
+
+
+def main():
+    bench_args, pipeline_argv = parse_args()
+    jobs = generate_jobs(bench_args.jobs, bench_args.relevant_fraction, bench_args.email_fraction, bench_args.seek_fraction, bench_args.seed)
+    search_terms = [f"Benchmark Search {i}" for i in range(bench_args.search_terms)]
+    datasets = {term: jobs[i::len(search_terms)] for i, term in enumerate(search_terms)}
+
+    work_dir = tempfile.mkdtemp(prefix='job-pipeline-benchmark-')
+    resume_path = os.path.join(work_dir, 'resume.pdf')
+    generate_cover_letter_pdf(RESUME_TEXT, resume_path)
+
+    try:
+        with FakeUpstreams(datasets, bench_args.llm_latency, bench_args.seek_latency, bench_args.throttle_rate, bench_args.seed) as upstreams, SmtpSink(bench_args.smtp_latency) as smtp:
+            os.environ.update({
+                'APIFY_KEY': 'benchmark',
+                'APIFY_API_URL': upstreams.url,
+                'OPENAI_KEY': 'benchmark',
+                'OPENAI_BASE_URL': f"{upstreams.url}/v1",
+                'SEEK_LOGIN_URL': upstreams.url,
+                'SEEK_GRAPHQL_URL': f"{upstreams.url}/graphql",
+                'SEEK_REFRESH_TOKEN_PATH': os.path.join(work_dir, 'seek_refresh_token.json'),
+                'EMAIL_ADDRESS': 'alex@example.com',
+                'EMAIL_APP_PASSWORD': 'benchmark',
+                'SMTP_HOST': '127.0.0.1',
+                'SMTP_PORT': str(smtp.port),
+                'SMTP_STARTTLS': '0',
+            })
+            write_json_file(os.environ['SEEK_REFRESH_TOKEN_PATH'], {'refresh_token': 'benchmark'})
+            duration = asyncio.run(run_pipeline(work_dir, resume_path, search_terms, pipeline_argv))
+            upstream_requests = dict(sorted(upstreams.requests.items()))
+            emails_received = smtp.messages
+
+        report = load_json_file(os.path.join(work_dir, 'run_report.json'))
+    finally:
+        if bench_args.keep:
+            logging.info(f"Benchmark working directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        'finished_at': datetime.now().isoformat(),
+        'settings': vars(bench_args),
+        'pipeline_args': pipeline_argv,
+        'jobs': bench_args.jobs,
+        'duration_seconds': round(duration, 3),
+        'jobs_per_second': round(bench_args.jobs / duration, 3),
+        'applications_per_second': round(report['counters'].get('jobs.applied', 0) / duration, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': report['stages'],
+        'counters': report['counters'],
+        'skips': report['skips'],
+        'upstream_requests': upstream_requests,
+        'emails_received': emails_received,
+    }
+
+    output = bench_args.output or os.path.join('benchmarks', 'results', f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    write_json_file(output, result)
+
+    logging.info(f"{bench_args.jobs} jobs in {duration:.1f}s: {result['jobs_per_second']:.1f} jobs/sec, "
+                 f"{report['counters'].get('jobs.applied', 0)} applied, {emails_received} emails, peak rss {result['peak_rss_mb'] or 0:.0f} MB")
+    for name, stage in report['stages'].items():
+        logging.info(f"  {name:<40} n={stage['count']:<6} p50 {stage['p50_seconds']:.4f}s  p95 {stage['p95_seconds']:.4f}s")
+    logging.info(f"Result written to {output}")
+
+    if bench_args.baseline:
+        compare(result, load_json_file(bench_args.baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import random
+
+# Job families, only 'software' overlaps the synthetic resume so the rest are mostly filtered before any llm work
+FAMILIES = {
+    'software': {
+        'titles': ['Software Engineer', 'Junior Software Developer', 'Backend Developer', 'Python Developer', 'Full Stack Developer', 'Graduate Software Engineer'],
+        'skills': ['Python', 'Django', 'FastAPI', 'REST APIs', 'PostgreSQL', 'Docker', 'AWS', 'Git', 'CI/CD', 'React', 'TypeScript', 'unit testing', 'Linux', 'SQL'],
+        'duties': [
+            'design, build and maintain backend services',
+            'write clean, tested and well documented code',
+            'collaborate with product and design on new features',
+            'review pull requests and mentor other developers',
+            'improve the performance and reliability of our platform',
+            'work in an agile team with fortnightly sprints',
+        ],
+    },
+    'data': {
+        'titles': ['Data Analyst', 'Data Engineer', 'Business Intelligence Analyst', 'Reporting Analyst'],
+        'skills': ['SQL', 'Power BI', 'Tableau', 'Excel', 'Python', 'dbt', 'Snowflake', 'data modelling', 'stakeholder management'],
+        'duties': [
+            'build dashboards and reports for the leadership team',
+            'maintain data pipelines and the data warehouse',
+            'turn business questions into analysis',
+            'ensure data quality across reporting',
+        ],
+    },
+    'nursing': {
+        'titles': ['Registered Nurse', 'Enrolled Nurse', 'Clinical Nurse Specialist', 'Aged Care Nurse'],
+        'skills': ['AHPRA registration', 'medication administration', 'patient assessment', 'wound care', 'care planning', 'infection control'],
+        'duties': [
+            'deliver high quality patient centred care',
+            'work across morning, afternoon and night shifts',
+            'liaise with doctors and allied health professionals',
+            'maintain accurate clinical documentation',
+        ],
+    },
+    'trades': {
+        'titles': ['Electrician', 'Plumber', 'Carpenter', 'HVAC Technician', 'Maintenance Technician'],
+        'skills': ['trade certificate', 'white card', 'drivers licence', 'fault finding', 'power tools', 'WHS compliance'],
+        'duties': [
+            'carry out installations and repairs on commercial sites',
+            'read plans and specifications',
+            'follow safe work method statements',
+            'maintain company vehicles and tools',
+        ],
+    },
+}
+
+COMPANY_PREFIXES = ['Blue', 'Southern', 'Harbour', 'Summit', 'Coastal', 'Iron', 'Bright', 'Red Gum', 'Northern', 'Pacific']
+COMPANY_SUFFIXES = ['Technologies', 'Health', 'Group', 'Solutions', 'Recruitment', 'Partners', 'Labs', 'Services']
+SUBURBS = ['Sydney CBD', 'Parramatta', 'North Sydney', 'Macquarie Park', 'Chatswood', 'Surry Hills']
+BENEFITS = ['hybrid working', 'an extra week of leave', 'salary packaging', 'a learning budget', 'flexible hours', 'parental leave']
+
+RESUME_TEXT = """Alex Citizen
+Software Developer, Sydney NSW
+
+Summary
+Junior software developer with two years of experience building backend services and web applications in Python.
+Comfortable across the stack with Django, FastAPI, React and TypeScript, deploying with Docker on AWS.
+
+Experience
+Software Developer, Harbour Labs (2023 - present)
+- Built and maintained REST APIs in Python with FastAPI and PostgreSQL
+- Wrote unit tests and set up CI/CD pipelines with GitHub Actions
+- Containerised services with Docker and deployed them to AWS
+- Worked in an agile team, reviewing pull requests and pairing with other developers
+
+Graduate Developer, Coastal Technologies (2022 - 2023)
+- Developed features for a Django web application and its React front end
+- Wrote SQL reports and improved slow queries
+
+Education
+Bachelor of Computer Science, University of Sydney
+
+Skills
+Python, Django, FastAPI, REST APIs, SQL, PostgreSQL, Docker, AWS, Git, CI/CD, React, TypeScript, Linux, unit testing
+"""
+
+def generate_jobs(count, relevant_fraction=0.3, email_fraction=0.3, seek_fraction=0.5, seed=0):
+    """Seek shaped job listings as returned by the websift/seek-job-scraper actor."""
+    rng = random.Random(seed)
+    other_families = [family for family in FAMILIES if family != 'software']
+    now = datetime.now()
+    jobs = []
+    for i in range(count):
+        family = FAMILIES['software' if rng.random() < relevant_fraction else rng.choice(other_families)]
+        title = rng.choice(family['titles'])
+        company = f"{rng.choice(COMPANY_PREFIXES)} {rng.choice(COMPANY_SUFFIXES)} {i % 400}"
+        skills = rng.sample(family['skills'], k=min(len(family['skills']), rng.randint(4, 7)))
+        duties = rng.sample(family['duties'], k=min(len(family['duties']), rng.randint(2, 4)))
+        sections = [
+            f"About {company}",
+            f"{company} is a growing team based in {rng.choice(SUBURBS)}. We are looking for a {title} to join us on a full time basis.",
+            "About the role",
+            *[f"- {duty.capitalize()}" for duty in duties],
+            "About you",
+            *[f"- Experience with {skill}" for skill in skills],
+            "What we offer",
+            f"We offer {rng.choice(BENEFITS)}, {rng.choice(BENEFITS)} and a supportive team. Apply now with your resume and cover letter.",
+        ]
+        domain = company.lower().replace(' ', '') + '.com.au'
+        jobs.append({
+            'id': str(80000000 + i),
+            'title': title,
+            'jobLink': f"https://www.seek.com.au/job/{80000000 + i}",
+            'listedAt': (now - timedelta(hours=rng.randint(0, 24 * 14))).isoformat(),
+            'companyProfile': {'name': company},
+            'advertiser': {'name': company},
+            'content': {'sections': sections},
+            'emails': [f"careers{rng.randint(1, 3)}@{domain}"] if rng.random() < email_fraction else [],
+            'hasRoleRequirements': rng.random() >= seek_fraction,
+            'isExternalApply': False,
+        })
+    return jobs
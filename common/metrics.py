@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from datetime import datetime
+import threading
+import logging
+import json
+import math
+import time
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+def percentile(sorted_values, q):
+    """Nearest rank percentile of an already sorted list, q between 0 and 1."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Metrics:
+    """
+    Timings, counters and skip reasons for a single run, safe to record from worker threads.
+    Spans are named 'area.operation', e.g. 'llm.openai.cover_letter' or 'seek.ApplySubmitApplication'.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+        self.counters = Counter()
+        self.skips = Counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            with self.lock:
+                self.errors[name] += 1
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.timings[name].append(seconds)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def skip(self, reason):
+        with self.lock:
+            self.skips[reason] += 1
+
+    def report(self):
+        with self.lock:
+            stages = {}
+            for name, values in sorted(self.timings.items()):
+                values = sorted(values)
+                stages[name] = {
+                    'count': len(values),
+                    'errors': self.errors[name],
+                    'total_seconds': round(sum(values), 4),
+                    'p50_seconds': round(percentile(values, 0.5), 4),
+                    'p95_seconds': round(percentile(values, 0.95), 4),
+                    'max_seconds': round(values[-1], 4),
+                }
+            return {
+                'started_at': self.started_at.isoformat(),
+                'duration_seconds': round((datetime.now() - self.started_at).total_seconds(), 2),
+                'stages': stages,
+                'counters': dict(sorted(self.counters.items())),
+                'skips': dict(sorted(self.skips.items())),
+            }
+
+    def write_report(self, path):
+        report = self.report()
+        _write_atomic(path, json.dumps(report, indent=4))
+        logging.info(f"Run report written to {path}: {report['counters'].get('jobs.applied', 0)} jobs applied to, {sum(report['skips'].values())} skips")
+
+    def write_prometheus(self, path):
+        """Write the report in prometheus text exposition format, e.g. for node_exporter's textfile collector."""
+        report = self.report()
+        lines = [
+            '# HELP job_pipeline_stage_seconds Duration of pipeline operations in the last run.',
+            '# TYPE job_pipeline_stage_seconds summary',
+        ]
+        for name, stage in report['stages'].items():
+            lines.append(f'job_pipeline_stage_seconds{{stage="{name}",quantile="0.5"}} {stage["p50_seconds"]}')
+            lines.append(f'job_pipeline_stage_seconds{{stage="{name}",quantile="0.95"}} {stage["p95_seconds"]}')
+            lines.append(f'job_pipeline_stage_seconds_sum{{stage="{name}"}} {stage["total_seconds"]}')
+            lines.append(f'job_pipeline_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines += ['# HELP job_pipeline_stage_errors Failed pipeline operations in the last run.', '# TYPE job_pipeline_stage_errors gauge']
+        lines += [f'job_pipeline_stage_errors{{stage="{name}"}} {stage["errors"]}' for name, stage in report['stages'].items()]
+        lines += ['# HELP job_pipeline_events Events counted during the last run.', '# TYPE job_pipeline_events gauge']
+        lines += [f'job_pipeline_events{{name="{name}"}} {value}' for name, value in report['counters'].items()]
+        lines += ['# HELP job_pipeline_skips Jobs and emails skipped during the last run by reason.', '# TYPE job_pipeline_skips gauge']
+        lines += [f'job_pipeline_skips{{reason="{reason}"}} {value}' for reason, value in report['skips'].items()]
+        lines += ['# HELP job_pipeline_run_duration_seconds Wall clock duration of the last run.', '# TYPE job_pipeline_run_duration_seconds gauge']
+        lines.append(f'job_pipeline_run_duration_seconds {report["duration_seconds"]}')
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
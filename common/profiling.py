@@ -0,0 +1,44 @@
+import logging
+import time
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows
+    resource = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+# Dependencies that cost noticeable import time or memory
+HEAVY_MODULES = [
+    'sentence_transformers',
+    'torch',
+    'numpy',
+    'scipy',
+    'reportlab',
+    'PyPDF2',
+    'openai',
+    'meta_ai_api',
+    'curl_cffi',
+    'requests_toolbelt',
+    'apify_client',
+]
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def log_startup_report(started_at, label="Startup"):
+    """Log elapsed time, peak rss and which heavy dependencies have been imported so far."""
+    elapsed = time.perf_counter() - started_at
+    rss = peak_rss_mb()
+    rss_text = f"{rss:.0f} MB" if rss is not None else "unavailable"
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    logging.info(f"{label} report: {elapsed:.2f}s elapsed, peak rss {rss_text}, heavy modules loaded: {', '.join(loaded) or 'none'}")
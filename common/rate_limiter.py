@@ -0,0 +1,174 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import threading
+import logging
+import asyncio
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class RateLimiter:
+    """
+    Token bucket for one upstream provider, usable from the event loop (acquire) and from worker threads (acquire_sync).
+    The refill rate adapts to the upstream: it halves and pauses on a 429 / Retry-After and creeps back up
+    towards max_rate on every success, so calls run as fast as the provider currently allows.
+    """
+    def __init__(self, name, per_minute, burst=1):
+        self.name = name
+        self.max_rate = per_minute / 60
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, possibly borrowing against the future, and return how long the caller must wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+            return max(wait, self.paused_until - now)
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self, retry_after=None):
+        """Record a rate limit response, retry_after is the raw Retry-After header value if one was sent."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = parse_retry_after(retry_after) or 1 / self.rate
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            logging.warning(f"{self.name} rate limited, pausing {pause:.1f}s and slowing to {self.rate * 60:.1f} requests/min")
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RequestScheduler:
+    """
+    Request and token budgets for an api that reports its limits in x-ratelimit-* response headers, e.g. openai.
+    Both budgets refill continuously at their per minute limit. Every response narrows them to what the
+    server says is left and replaces the assumed limits with the account's real ones, so as many requests
+    are kept in flight as the account tier allows and the rest wait in acquire. Used from the event loop only.
+    """
+    def __init__(self, name, requests_per_minute, tokens_per_minute):
+        self.name = name
+        self.budgets = {
+            'requests': [requests_per_minute, requests_per_minute],
+            'tokens': [tokens_per_minute, tokens_per_minute],
+        }
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.in_flight = 0
+        self._changed = None
+
+    @property
+    def changed(self):
+        # Created lazily so the condition belongs to the running event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _refill(self):
+        now = time.monotonic()
+        for budget in self.budgets.values():
+            limit, remaining = budget
+            budget[1] = min(limit, remaining + (now - self.updated) * limit / 60)
+        self.updated = now
+
+    def _wait_time(self, tokens):
+        """Seconds until a request estimated to use tokens fits in both budgets, 0 if it fits now."""
+        self._refill()
+        wait = self.paused_until - time.monotonic()
+        for needed, (limit, remaining) in ((1, self.budgets['requests']), (min(tokens, self.budgets['tokens'][0]), self.budgets['tokens'])):
+            if remaining < needed:
+                wait = max(wait, (needed - remaining) / (limit / 60))
+        return wait
+
+    async def acquire(self, tokens):
+        """Wait for room for one request using about tokens tokens, then take it from both budgets."""
+        async with self.changed:
+            while (wait := self._wait_time(tokens)) > 0:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            self.budgets['requests'][1] -= 1
+            self.budgets['tokens'][1] -= tokens
+            self.in_flight += 1
+
+    async def release(self, headers=None):
+        """Return the in flight slot, updating the budgets from the response's rate limit headers."""
+        async with self.changed:
+            self.in_flight -= 1
+            self._refill()
+            for kind, budget in self.budgets.items():
+                limit = _header_number(headers, f'x-ratelimit-limit-{kind}')
+                remaining = _header_number(headers, f'x-ratelimit-remaining-{kind}')
+                if limit:
+                    budget[0] = limit
+                if remaining is not None:
+                    budget[1] = min(budget[1], remaining)
+            self.changed.notify_all()
+
+    async def throttled(self, retry_after=None):
+        async with self.changed:
+            pause = parse_retry_after(retry_after) or 1
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self.in_flight -= 1
+            logging.warning(f"{self.name} rate limited with {self.in_flight} requests in flight, pausing {pause:.1f}s")
+            self.changed.notify_all()
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers[name])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header given as either seconds or an http date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+RATE_LIMITERS = {
+    'openai': RequestScheduler('openai', requests_per_minute=500, tokens_per_minute=200000),
+    'meta': RateLimiter('meta', per_minute=2),
+    'seek': RateLimiter('seek', per_minute=60, burst=3),
+    'smtp': RateLimiter('smtp', per_minute=20),
+}
+
+def configure_rate_limiters(args):
+    RATE_LIMITERS['openai'] = RequestScheduler('openai', requests_per_minute=args.openai_rpm, tokens_per_minute=args.openai_tpm)
+    RATE_LIMITERS['meta'] = RateLimiter('meta', per_minute=args.meta_rpm)
+    RATE_LIMITERS['seek'] = RateLimiter('seek', per_minute=args.seek_rpm, burst=3)
+    RATE_LIMITERS['smtp'] = RateLimiter('smtp', per_minute=args.smtp_rpm)
+
+def get_rate_limiter(name):
+    return RATE_LIMITERS[name]
@@ -0,0 +1,42 @@
+from common.utils import extract_text_from_pdf, load_json_file, write_json_file
+from pathlib import Path
+import hashlib
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class ResumeCache:
+    """
+    Extracted text and embeddings of a resume pdf, cached in a json file next to the pdf.
+    The cache is keyed by a hash of the pdf so editing the resume invalidates it.
+    """
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.cache_path = f"{pdf_path}.cache.json"
+        self.file_hash = hashlib.sha256(Path(pdf_path).read_bytes()).hexdigest()
+
+        cache = load_json_file(self.cache_path) if Path(self.cache_path).exists() else {}
+        if cache.get('sha256') != self.file_hash:
+            cache = {'sha256': self.file_hash, 'text': None, 'embeddings': {}}
+        self.cache = cache
+
+    @property
+    def text(self):
+        if self.cache['text'] is None:
+            logging.info(f"Extracting text from {self.pdf_path}")
+            self.cache['text'] = extract_text_from_pdf(self.pdf_path)
+            self.save()
+        return self.cache['text']
+
+    def embedding(self, model_name):
+        return self.cache['embeddings'].get(model_name)
+
+    def set_embedding(self, model_name, vector):
+        self.cache['embeddings'][model_name] = [float(x) for x in vector]
+        self.save()
+
+    def save(self):
+        write_json_file(self.cache_path, self.cache)
@@ -1,20 +1,30 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.units import inch
-from PyPDF2 import PdfReader
 from pathlib import Path
 import logging
+import asyncio
+import random
 import json
 import sys
 import os
+import re
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
 )
 
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+def tokenize(text):
+    """Lower case word tokens that keep tech terms such as c++, c# and node.js intact."""
+    return TOKEN_PATTERN.findall(text.lower())
+
 def generate_cover_letter_pdf(cover_letter, output_file):
+    # reportlab is imported on first use to keep startup cheap
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.units import inch
+
     document = SimpleDocTemplate(output_file, pagesize=A4)
 
     styles = getSampleStyleSheet()
@@ -53,14 +63,11 @@ def format_cover_letter(cover_letter):
 
 def extract_text_from_pdf(pdf_path):
     try:
+        from PyPDF2 import PdfReader
         reader = PdfReader(pdf_path)
-        text = ""
+        page_texts = (page.extract_text() for page in reader.pages)
 
-        for page in reader.pages:
-            if page.extract_text():
-                text += page.extract_text()
-        
-        return text.strip()
+        return "".join(text for text in page_texts if text).strip()
     except Exception as e:
         logging.error(f"Error converting pdf to text {e}")
         sys.exit(1)
@@ -75,9 +82,21 @@ def load_json_file(file_path):
 
 def write_json_file(file_path, data):
     file = Path(file_path)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
     try:
         with file.open('w') as f:
             json.dump(data, f, indent=4)
     except Exception as e:
-        logging.error(f"Error writing to file {file_path}: {e}")    
\ No newline at end of file
+        logging.error(f"Error writing to file {file_path}: {e}")
+
+async def retry_async(fn, retries=3, base_delay=2, max_delay=60, description="request"):
+    """Await fn(), retrying failures with jittered exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logging.warning(f"{description} failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
@@ -1,8 +1,8 @@
 import argparse
 
-parser = argparse.ArgumentParser()
-
-def add_args():
+def add_args(argv=None):
+    # A fresh parser per call so the pipeline can be configured more than once in a process, e.g. by benchmarks
+    parser = argparse.ArgumentParser()
     parser.add_argument('--first_name', 
                         type=str, 
                         help='Name of the user',
@@ -10,7 +10,7 @@ def add_args():
 
     parser.add_argument('--resume_pdf_path', 
                         type=str,
-                        help='Path to resume',
+                        help='Path to resume, or a directory of resumes to pick the best match from per job',
                         default="application_pipeline/application_materials/resume.pdf")
 
     parser.add_argument('--config_path', 
@@ -18,16 +18,101 @@ def add_args():
                         help='Path to config file',
                         default="config/run_config.json")
     
+    parser.add_argument('--prefilter_config', 
+                        type=str,
+                        help='Path to lexical prefilter config, empty to disable',
+                        default="config/prefilter.json")
+    
     parser.add_argument('--cover_letter_path', 
                         type=str,
                         help='Path to cover letter',
                         default="application_pipeline/application_materials/cover_letter.pdf")
     
+    parser.add_argument('--cover_letter_reuse_similarity', 
+                        type=float,
+                        help='Min similarity to a cached posting from the same company to reuse its cover letter. 0 = disabled',
+                        default=0.9)
+
+    parser.add_argument('--cover_letter_cache_days', 
+                        type=int,
+                        help='Days a generated cover letter can be reused',
+                        default=30)
+    
+    parser.add_argument('--llm_cache_path', 
+                        type=str,
+                        help='Path to the sqlite cache of openai responses, empty to disable',
+                        default="application_pipeline/application_materials/llm_cache.db")
+
+    parser.add_argument('--llm_cache_days', 
+                        type=int,
+                        help='Days a cached openai response is reused',
+                        default=30)
+
+    parser.add_argument('--llm_cache_max_entries', 
+                        type=int,
+                        help='Max cached openai responses, the least recently used are evicted first',
+                        default=5000)
+    
+    parser.add_argument('--store_path', 
+                        type=str,
+                        help='Path to the sqlite database of applied jobs and contacted emails',
+                        default="application_pipeline/application_materials/applied.db")
+
     parser.add_argument('--applied_path', 
                         type=str,
-                        help='Path to applied jobs',
+                        help='Path to a legacy applied.json, imported into the store when it is first created',
                         default="application_pipeline/application_materials/applied.json")
 
+    parser.add_argument('--email_cooldown_days', 
+                        type=float,
+                        help='Days before the same email address is contacted again',
+                        default=7)
+
+    parser.add_argument('--domain_cooldown_days', 
+                        type=float,
+                        help='Days before anyone at the same company email domain is contacted again, public mail providers are exempt. 0 = disabled',
+                        default=1)
+
+    parser.add_argument('--embedding_store_dir', 
+                        type=str,
+                        help='Directory of cached job description embeddings',
+                        default="application_pipeline/application_materials/embeddings")
+
+    parser.add_argument('--scrape_state_path', 
+                        type=str,
+                        help='Path to per search term scrape high-water marks',
+                        default="application_pipeline/application_materials/scrape_state.json")
+
+    parser.add_argument('--incremental', 
+                        type=int,
+                        help='Only scrape listings newer than the previous run. 0 = False',
+                        default=1)
+
+    parser.add_argument('--scrape_concurrency', 
+                        type=int,
+                        help='Max apify actor runs in flight at once',
+                        default=5)
+
+    parser.add_argument('--scrape_retries', 
+                        type=int,
+                        help='Times a failed apify actor run is retried with backoff',
+                        default=3)
+
+    parser.add_argument('--scrape_cache_dir', 
+                        type=str,
+                        help='Directory of cached apify datasets',
+                        default="application_pipeline/application_materials/scrape_cache")
+
+    parser.add_argument('--scrape_cache_ttl', 
+                        type=float,
+                        help='Hours a cached apify dataset is reused instead of starting a new actor run. 0 = disabled',
+                        default=6)
+
+    parser.add_argument('--replay', 
+                        type=int,
+                        help='Dry run that scores the newest cached dataset of each search term without calling apify and logs the jobs that would be applied to. No llm, seek, email or store writes are made. 0 = False',
+                        default=0)
+
     parser.add_argument('--mail_protocol', 
                         type=str,
                         help='Mail protocol e.g gmail.com, outlook.com',
@@ -49,13 +134,102 @@ def add_args():
                         help='Min job matching score',
                         default=0.4)
     
+    parser.add_argument('--embedding_batch_size',
+                        type=int,
+                        help='Job descriptions encoded per model forward pass',
+                        default=32)
+
+    parser.add_argument('--score_workers',
+                        type=int,
+                        help='Concurrent workers scoring jobs against the resume',
+                        default=1)
+
+    parser.add_argument('--generate_workers',
+                        type=int,
+                        help='Cover letters generated concurrently, openai requests beyond the account rate limits are queued, meta ai always uses 1',
+                        default=32)
+
+    parser.add_argument('--submit_workers',
+                        type=int,
+                        help='Concurrent workers applying via seek & email, seek applications are still made one at a time',
+                        default=1)
+
+    parser.add_argument('--queue_size',
+                        type=int,
+                        help='Max jobs waiting between pipeline stages, pages of jobs before scoring',
+                        default=20)
+
+    parser.add_argument('--duplicate_distance',
+                        type=float,
+                        help='Skip jobs within this cosine distance of a recent application. 0 = disabled',
+                        default=0.03)
+
+    parser.add_argument('--duplicate_window_days',
+                        type=int,
+                        help='Days an application is checked for reposted duplicates',
+                        default=60)
+
+    parser.add_argument('--duplicate_index',
+                        type=str,
+                        choices=['numpy', 'hnsw'],
+                        help='Duplicate index backend, hnsw needs hnswlib installed',
+                        default='numpy')
+
+    parser.add_argument('--dataset_page_size',
+                        type=int,
+                        help='Number of scraped jobs read from each apify dataset per request',
+                        default=100)
+
+    parser.add_argument('--openai_rpm',
+                        type=float,
+                        help='Openai requests per minute assumed until the first response reports the account limit',
+                        default=500)
+
+    parser.add_argument('--openai_tpm',
+                        type=float,
+                        help='Openai tokens per minute assumed until the first response reports the account limit',
+                        default=200000)
+
+    parser.add_argument('--meta_rpm',
+                        type=float,
+                        help='Max meta ai requests per minute',
+                        default=2)
+
+    parser.add_argument('--seek_rpm',
+                        type=float,
+                        help='Max seek requests per minute, lowered automatically while seek is rate limiting',
+                        default=60)
+
+    parser.add_argument('--smtp_rpm',
+                        type=float,
+                        help='Max emails sent per minute, lowered automatically while the mail server is throttling',
+                        default=20)
+
+    parser.add_argument('--report_path',
+                        type=str,
+                        help='Path of the json run report with per stage timings, counters and skip reasons, empty string to disable',
+                        default="application_pipeline/application_materials/run_report.json")
+
+    parser.add_argument('--prometheus_path',
+                        type=str,
+                        help='Also write the run report in prometheus text format to this path, e.g. for the node_exporter textfile collector',
+                        default="")
+
     parser.add_argument('--show_recent_role',
                             type=int,
                             help='Adds recent role to seek job application for employers. 0 = False',
                             default=1)
     
-    args = parser.parse_args()
+    parser.add_argument('--startup_report',
+                        type=int,
+                        help='Log elapsed time, peak memory & heavy modules loaded at startup and after the run. 0 = False',
+                        default=0)
+
+    args = parser.parse_args(argv)
     args.australian_language = bool(args.australian_language)
     args.show_recent_role = bool(args.show_recent_role)
+    args.incremental = bool(args.incremental)
+    args.replay = bool(args.replay)
+    args.startup_report = bool(args.startup_report)
 
     return args
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """
 Simple Job Application Dashboard
-Run with: uv python dashboard.py [path/to/applied.json]
+Run with: uv python dashboard.py [path/to/applied.db or applied.json]
 Then open: http://localhost:8000
 """
 
 from fastapi.responses import HTMLResponse, JSONResponse
+from application_pipeline.application_store import ApplicationStore
 from fastapi import FastAPI, HTTPException
 from pathlib import Path
 import json
@@ -15,7 +16,7 @@ import uvicorn
 app = FastAPI()
 
 # File path configuration - can be overridden via CLI
-DEFAULT_PATH = "application_pipeline/application_materials/applied.json"
+DEFAULT_PATH = "application_pipeline/application_materials/applied.db"
 DATA_FILE = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(DEFAULT_PATH)
 
 HTML_TEMPLATE = """
@@ -351,8 +352,15 @@ async def load_data():
         if not DATA_FILE.exists():
             raise HTTPException(status_code=404, detail=f'File not found: {DATA_FILE}')
         
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
+        if DATA_FILE.suffix == '.json':
+            with open(DATA_FILE, 'r') as f:
+                data = json.load(f)
+        else:
+            store = ApplicationStore(str(DATA_FILE))
+            try:
+                data = store.to_dict()
+            finally:
+                store.close()
         
         return data
     except json.JSONDecodeError:
@@ -375,7 +383,7 @@ if __name__ == '__main__':
     print("\n🌐 Open your browser and go to:")
     print("   http://localhost:8000")
     print("\n💡 Usage:")
-    print(f"   python {sys.argv[0]} [path/to/applied.json]")
+    print(f"   python {sys.argv[0]} [path/to/applied.db or applied.json]")
     print("\n⏹️  Press CTRL+C to stop the server\n")
     
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -1,7 +1,9 @@
-from meta_ai_api import MetaAI
+from integrations.cover_letter_validator import CoverLetterValidator
+from common.rate_limiter import get_rate_limiter
+from common.metrics import METRICS
 from dotenv import load_dotenv
-from openai import OpenAI
 import logging
+import asyncio
 import os
 import re
 
@@ -13,20 +15,76 @@ logging.basicConfig(
 )
 
 class AIAgent:
-    def __init__(self, name, model=""):
+    def __init__(self, name, model="", cache=None):
         if os.getenv("OPENAI_KEY"):
-            self.agent = OpenAiAgent(name, model)
+            self.agent = OpenAiAgent(name, model, cache)
         else:
-            self.agent = MetaAI(name)
+            self.agent = MetaAgent(name)
 
 
 class OpenAiAgent:
-    def __init__(self, name, model):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_KEY"))
+    MAX_ATTEMPTS = 5
+    # Completions are not capped with max_tokens, a cover letter is roughly this long
+    COMPLETION_TOKEN_ESTIMATE = 800
+
+    def __init__(self, name, model, cache=None):
+        # Imported on first use to keep startup cheap
+        from openai import AsyncOpenAI
+        # Retries are handled in _create so rate limits feed back into the shared openai scheduler
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_KEY"), max_retries=0)
         self.model = model
         self.name = name
+        # Optional ResponseCache, anything with the same key/get/put methods can be plugged in
+        self.cache = cache
+        self.validators = {}
+
+    async def _complete(self, operation, messages, **params):
+        """Text of the completion for messages, served from the response cache when the same request was made before."""
+        key = self.cache.key(self.model, messages, params) if self.cache is not None else None
+        if key:
+            content = self.cache.get(key)
+            if content is not None:
+                return content
+
+        response = await self._create(operation, messages, **params)
+        content = response.choices[0].message.content
+        if key and content is not None:
+            self.cache.put(key, self.model, content)
+        return content
+
+    async def _create(self, operation, messages, **params):
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+        scheduler = get_rate_limiter('openai')
+        tokens = sum(len(message['content']) for message in messages) // 4 + self.COMPLETION_TOKEN_ESTIMATE
+        for attempt in range(self.MAX_ATTEMPTS):
+            await scheduler.acquire(tokens)
+            try:
+                with METRICS.span(f'llm.openai.{operation}'):
+                    raw_response = await self.client.chat.completions.with_raw_response.create(model=self.model, messages=messages, **params)
+            except RateLimitError as e:
+                await scheduler.throttled(e.response.headers.get('retry-after'))
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                METRICS.count('llm.openai.throttled')
+                continue
+            except (APIConnectionError, InternalServerError) as e:
+                await scheduler.release()
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                logging.warning(f"Openai request failed ({e}), retrying")
+                await asyncio.sleep(2 ** attempt)
+                continue
+            except BaseException:
+                await scheduler.release()
+                raise
+            await scheduler.release(raw_response.headers)
+            response = raw_response.parse()
+            if response.usage:
+                METRICS.count('llm.openai.prompt_tokens', response.usage.prompt_tokens)
+                METRICS.count('llm.openai.completion_tokens', response.usage.completion_tokens)
+            return response
     
-    def prepare_cover_letter(self, job_data, resume, convert_to_australian_language):
+    async def prepare_cover_letter(self, job_data, resume, convert_to_australian_language):
         job_content = job_data.get('content', {})
         job_description = job_content.get('sections', '')
         
@@ -111,9 +169,7 @@ class OpenAiAgent:
             ```
             """
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        cover_text = await self._complete('cover_letter', [
                 {
                     "role": "system",
                     "content": (
@@ -129,15 +185,29 @@ class OpenAiAgent:
             ]
         )
 
-        cover_text = response.choices[0].message.content.strip()
-        print(cover_text)
-        print("-"*50)
-        final_coverletter = self.review_coverletter(cover_text, resume, job_description)
-        print(final_coverletter)
-        print(cover_text == final_coverletter)
-        return final_coverletter.strip('```')
-
-    def review_coverletter(self, cover_letter_text, original_resume, original_job_description, adjustment_requests=""):
+        cover_text = cover_text.strip().strip('```').strip()
+        # The review round trip is only needed when the draft breaks one of the rules above
+        validator = self.validators.get(resume) or self.validators.setdefault(resume, CoverLetterValidator(resume))
+        problems = validator.problems(cover_text)
+        if not problems:
+            METRICS.count('llm.review_skipped')
+            return self._clean_letter(cover_text)
+
+        logging.info(f"Cover letter for {position} at {company_name} needs review: {' '.join(problems)}")
+        final_coverletter = await self.review_coverletter(cover_text, resume, job_description, "\n".join(problems))
+        if final_coverletter != cover_text:
+            METRICS.count('llm.review_changed_letter')
+        return self._clean_letter(final_coverletter)
+
+    async def close(self):
+        await self.client.close()
+
+    @staticmethod
+    def _clean_letter(cover_letter_text):
+        # Applied whether or not the letter was reviewed so both paths produce the same formatting
+        return cover_letter_text.strip().strip('```').strip().replace('-', '')
+
+    async def review_coverletter(self, cover_letter_text, original_resume, original_job_description, adjustment_requests=""):
         prompt = f"""
             ## Optimized Prompt for Cover Letter Verification and Small Adjustments
 
@@ -195,9 +265,7 @@ class OpenAiAgent:
             ```
             """
         
-        response = self.client.chat.completions.create(
-        model=self.model,
-        messages=[
+        final_coverletter = await self._complete('review', [
                 {
                     "role": "system",
                     "content": (
@@ -211,14 +279,15 @@ class OpenAiAgent:
             ]
         )
 
-        final_coverletter = response.choices[0].message.content.strip().replace('-', '')
-        return final_coverletter
+        return final_coverletter.strip()
 
-    def write_email_contents(self):
+    async def write_email_contents(self):
         email_prompt = f"""
             **Task:** Write a short, polite cold email to a recruiter.
             The email must mention that the resume and cover letter are attached.
             Do not include a subject line.
+            The email is reused for every job, so refer to the role only as $position and to the
+            company only as $company, written exactly like that, they are filled in before sending.
 
             **Required Output Format (Strictly follow this):**
             Dear Hiring Manager,
@@ -227,9 +296,7 @@ class OpenAiAgent:
             {self.name}
         """
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        email_text = await self._complete('email', [
                 {
                     "role": "system",
                     "content": (
@@ -244,16 +311,16 @@ class OpenAiAgent:
             ]
         )
 
-        email_text = response.choices[0].message.content.strip()
-        return email_text
+        return email_text.strip()
 
 
 class MetaAgent:
     def __init__(self, name):
+        from meta_ai_api import MetaAI
         self.client = MetaAI()
         self.name = name
     
-    def prepare_cover_letter(self, job_data, resume, convert_to_australian_language):
+    async def prepare_cover_letter(self, job_data, resume, convert_to_australian_language):
         job_description = job_data.get('content', '').get('sections', '')
         position = job_data.get('title', 'Unknown position')
         company_name = job_data.get('companyProfile', {}).get('name', 'Unknown company')
@@ -275,16 +342,21 @@ class MetaAgent:
             treat this as a final copy & only return the contents of the email
             """
         
-        initial_cover = self.client.prompt(message=prompt, new_conversation=True)
+        with METRICS.span('llm.meta.cover_letter'):
+            # The meta ai client is synchronous
+            initial_cover = await asyncio.to_thread(self.client.prompt, message=prompt, new_conversation=True)
 
         cleaned_letter = re.sub(rf".*?(Dear .*?Best Regards\n{self.name}\n).*", r"\1", initial_cover['message'], flags=re.DOTALL)
         return cleaned_letter
 
-    def write_email_contents(self):
-        email_content = self.client.prompt(message=f"""
-            Now write the contents of the email, I have scraped these email of these recruiters so keep the cold email brief and to the point, I will also be attaching my resume and cover letter
+    async def write_email_contents(self):
+        with METRICS.span('llm.meta.email'):
+            # A new conversation so details of the job whose cover letter was just written stay out of the shared template
+            email_content = await asyncio.to_thread(self.client.prompt, new_conversation=True, message=f"""
+            Write the contents of a cold email to recruiters applying for a job, I have scraped the emails of these recruiters so keep the cold email brief and to the point, I will also be attaching my resume and cover letter
+            the email is reused for every job so refer to the role only as $position and the company only as $company, written exactly like that
             format the email in as follows & exclude a subject:
-            Dear first name
+            Dear Hiring Manager
             contents of email
             Best Regards
             {self.name}
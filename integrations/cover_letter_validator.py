@@ -0,0 +1,59 @@
+from common.utils import tokenize
+import re
+
+MAX_WORDS = 400
+
+SALUTATION_PATTERN = re.compile(r"^(dear|hello|hi|to whom it may concern)\b", re.IGNORECASE)
+CLOSING_PATTERN = re.compile(
+    r"^(sincerely|yours sincerely|yours faithfully|yours truly|kind regards|best regards|warm regards|regards|best|thank you|many thanks)\s*,?$",
+    re.IGNORECASE
+)
+PLACEHOLDER_PATTERN = re.compile(r"\[[^\]\n]*\]|[\[\]]")
+
+# Skills the letter must never claim unless the resume does, in common.utils.tokenize form.
+# Terms that are also everyday words (go, swift, excel, spring, express...) are left out to avoid false alarms
+TECH_TERMS = {
+    'python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'golang', 'rust', 'ruby', 'php', 'kotlin',
+    'scala', 'matlab', 'perl', 'sql', 'nosql', 'html', 'css', 'sass', 'bash', 'powershell', 'graphql',
+    'react', 'angular', 'vue', 'svelte', 'next.js', 'node.js', 'nodejs', 'django', 'flask', 'fastapi',
+    'laravel', 'dotnet', 'asp.net', 'jquery', 'redux', 'tailwind', 'bootstrap',
+    'postgresql', 'postgres', 'mysql', 'sqlite', 'mongodb', 'redis', 'elasticsearch', 'cassandra', 'dynamodb', 'snowflake',
+    'oracle', 'kafka', 'rabbitmq', 'hadoop', 'airflow', 'dbt', 'databricks',
+    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'k8s', 'terraform', 'ansible', 'jenkins', 'linux', 'git', 'github',
+    'gitlab', 'jira', 'nginx', 'serverless', 'microservices',
+    'tensorflow', 'pytorch', 'keras', 'pandas', 'numpy', 'scikit', 'sklearn', 'tableau', 'salesforce',
+    'figma', 'selenium', 'cypress', 'pytest', 'junit',
+}
+
+class CoverLetterValidator:
+    """
+    Local checks for the rules given to the llm when a cover letter is generated, so the review
+    round trip is only made for letters that break one. The resume's tokens are computed once.
+    """
+    def __init__(self, resume_text, max_words=MAX_WORDS, tech_terms=TECH_TERMS):
+        self.resume_tokens = set(tokenize(resume_text))
+        self.max_words = max_words
+        self.tech_terms = tech_terms
+
+    def problems(self, cover_letter):
+        """Descriptions of every rule the letter breaks, empty if it can be used as is."""
+        problems = []
+        placeholders = PLACEHOLDER_PATTERN.findall(cover_letter)
+        if placeholders:
+            problems.append(f"Remove the placeholders {', '.join(sorted(set(placeholders)))}.")
+
+        words = len(cover_letter.split())
+        if words > self.max_words:
+            problems.append(f"Shorten the letter to at most {self.max_words} words, it is {words} words.")
+
+        lines = [line.strip() for line in cover_letter.strip().splitlines() if line.strip()]
+        if not lines or not SALUTATION_PATTERN.match(lines[0]):
+            problems.append("Start the letter directly with a salutation such as 'Dear Hiring Manager,'.")
+        if not lines or not CLOSING_PATTERN.match(lines[-1]):
+            problems.append("End the letter directly with a closing such as 'Sincerely,' with no name after it.")
+
+        unsupported = sorted({token for token in tokenize(cover_letter) if token in self.tech_terms} - self.resume_tokens)
+        if unsupported:
+            problems.append(f"Remove claims about {', '.join(unsupported)}, they are not in the resume.")
+
+        return problems
@@ -0,0 +1,16 @@
+from string import Template
+
+class EmailTemplate:
+    """
+    Recruiter email body written once per run by the llm, with $position and $company placeholders
+    filled in locally for each job. Any other $ in the text, e.g. a salary, is left as written.
+    """
+    def __init__(self, text):
+        self.template = Template(text)
+
+    def render(self, job_data):
+        company_name = job_data.get('companyProfile', {}).get('name') or job_data.get('advertiser', {}).get('name') or 'your company'
+        return self.template.safe_substitute(
+            position=job_data.get('title') or 'the advertised position',
+            company=company_name
+        )
@@ -1,3 +1,5 @@
+from common.rate_limiter import get_rate_limiter
+from common.metrics import METRICS
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
 from email.mime.text import MIMEText
@@ -9,6 +11,7 @@ import logging
 import imaplib
 import smtplib
 import email
+import time
 import re
 import os
 
@@ -20,11 +23,18 @@ logging.basicConfig(
 )
 
 class MailClient:
+    # Transient smtp replies, usually the server asking the sender to slow down
+    THROTTLE_CODES = {421, 450, 451, 452}
+    MAX_THROTTLE_RETRIES = 3
+
     def __init__(self, mail_protocol):
         self.user_email = os.getenv("EMAIL_ADDRESS")
         self.app_password = os.getenv("EMAIL_APP_PASSWORD")
         self.mail_protocol = mail_protocol
-        self.smtp_port = 587
+        # Overridable to send through a local smtp server, e.g. for benchmarks
+        self.smtp_host = os.getenv("SMTP_HOST", f"smtp.{mail_protocol}")
+        self.smtp_port = int(os.getenv("SMTP_PORT", 587))
+        self.smtp_starttls = os.getenv("SMTP_STARTTLS", "1") != "0"
     
     def send_application(self, recipient_email, job_data, email_body, resume_path, cover_letter_path):
         try:
@@ -76,10 +86,23 @@ class MailClient:
         return msg
     
     def _send_email(self, msg):
-        with smtplib.SMTP(f'smtp.{self.mail_protocol}', self.smtp_port) as server:
-            server.starttls()
-            server.login(self.user_email, self.app_password)
-            server.send_message(msg)
+        limiter = get_rate_limiter('smtp')
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+            limiter.acquire_sync()
+            try:
+                with METRICS.span('smtp.send'), smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+                    if self.smtp_starttls:
+                        server.starttls()
+                    server.login(self.user_email, self.app_password)
+                    server.send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code not in self.THROTTLE_CODES or attempt == self.MAX_THROTTLE_RETRIES:
+                    raise
+                METRICS.count('smtp.throttled')
+                limiter.throttled()
+                continue
+            limiter.succeeded()
+            return
     
     def parse_code(self, subject):
         match = re.search(r"\b\d{6}\b", subject)
@@ -90,6 +113,24 @@ class MailClient:
 
     def fetch_code(self, from_):
         msg = self.fetch_last_email(from_=from_)
+        return self._code_from_message(msg)
+
+    def last_message_id(self, from_):
+        msg = self.fetch_last_email(from_=from_)
+        return msg['Message-ID'] if msg else None
+
+    def wait_for_code(self, from_, previous_message_id=None, timeout=120, interval=2):
+        """Poll the inbox until an email from from_ other than previous_message_id arrives and return its code."""
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self.fetch_last_email(from_=from_)
+            if msg is not None and msg['Message-ID'] != previous_message_id:
+                return self._code_from_message(msg)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No new email from {from_} after {timeout} seconds")
+            time.sleep(interval)
+
+    def _code_from_message(self, msg):
         subject, encoding = decode_header(msg["Subject"])[0]
 
         if isinstance(subject, bytes):
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from common.metrics import METRICS
+import threading
+import hashlib
+import logging
+import sqlite3
+import json
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    created_on TEXT NOT NULL,
+    last_used_on TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used_on ON responses (last_used_on);
+"""
+
+class ResponseCache:
+    """
+    Completions keyed by a hash of the model, every message and the sampling params, in a sqlite database,
+    so a prompt that was already answered in an earlier run, or before a crash, is never paid for twice.
+    Entries older than max_age_days are dropped and the least recently used are evicted beyond max_entries.
+    The async openai agent calls get and put from the event loop, the lock keeps the connection safe if it is shared with worker threads.
+    """
+    def __init__(self, path, max_age_days=30, max_entries=5000):
+        self.path = path
+        self.max_age = timedelta(days=max_age_days)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        with self.lock:
+            self._evict()
+
+    @staticmethod
+    def key(model, messages, params=None):
+        payload = json.dumps({'model': model, 'messages': messages, 'params': params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content FROM responses WHERE key = ? AND created_on > ?",
+                (key, (datetime.now() - self.max_age).isoformat())
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                METRICS.count('llm.cache.miss')
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET last_used_on = ? WHERE key = ?", (datetime.now().isoformat(), key))
+            self.hits += 1
+            METRICS.count('llm.cache.hit')
+            return row[0]
+
+    def put(self, key, model, content):
+        now = datetime.now().isoformat()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, created_on, last_used_on, content) VALUES (?, ?, ?, ?, ?)",
+                (key, model, now, now, content)
+            )
+            self._evict()
+
+    def _evict(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM responses WHERE created_on <= ?", ((datetime.now() - self.max_age).isoformat(),))
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_on DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        logging.info(f"LLM response cache: {self.hits} hits, {self.misses} misses")
+        with self.lock:
+            self.conn.close()
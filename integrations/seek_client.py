@@ -1,8 +1,8 @@
 from common.utils import load_json_file, write_json_file
 from integrations.mail_handler import MailClient
-from requests_toolbelt import MultipartEncoder
+from common.rate_limiter import get_rate_limiter
+from common.metrics import METRICS
 from urllib.parse import urlparse, parse_qs
-from curl_cffi import requests
 from dotenv import load_dotenv
 import logging
 import uuid
@@ -22,13 +22,31 @@ class SeekClient:
     CLIENT_ID = "yGBVge66K5NJpSN5u71fU90VcTlEASNu"
     SEEK_LOGIN_SENDER = "noreply@seek.com.au"
     USER_EMAIL = os.getenv("EMAIL_ADDRESS")
-    REFRESH_TOKEN_PATH = "credentials/seek_refresh_token.json"
+    REFRESH_TOKEN_PATH = os.getenv("SEEK_REFRESH_TOKEN_PATH", "credentials/seek_refresh_token.json")
+    # Overridable to point the client at a local stand-in, e.g. for benchmarks
+    LOGIN_URL = os.getenv("SEEK_LOGIN_URL", "https://login.seek.com")
+    GRAPHQL_URL = os.getenv("SEEK_GRAPHQL_URL", "https://www.seek.com.au/graphql")
+    MAX_THROTTLE_RETRIES = 3
+    PROCESS_ATTEMPTS = 6
 
     def __init__(self, mail_client: MailClient):
         self.mail_client = mail_client
         self.is_logged_in = False
+        self._session = None
     
     def __enter__(self):
+        self.refresh_token = load_json_file(self.REFRESH_TOKEN_PATH).get("refresh_token")
+        return self
+
+    @property
+    def session(self):
+        # curl_cffi is imported and the session created on first request to keep startup cheap
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        from curl_cffi import requests
         headers = {
             'accept': '*/*',
             'accept-language': 'en-US,en;q=0.6',
@@ -48,13 +66,11 @@ class SeekClient:
             'x-request-language': 'en-au',
         }
 
-        self.session = requests.Session(impersonate="chrome", headers=headers, allow_redirects=True)
-        self.refresh_token = load_json_file(self.REFRESH_TOKEN_PATH).get("refresh_token")
-        return self
+        return requests.Session(impersonate="chrome", headers=headers, allow_redirects=True)
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if self.session:
-            self.session.close()
+        if self._session:
+            self._session.close()
         if self.refresh_token:
             write_json_file(self.REFRESH_TOKEN_PATH, {"refresh_token": self.refresh_token})
 
@@ -78,12 +94,13 @@ class SeekClient:
                     'audience': 'https://seek/api/candidate',
                 },
             }
-            response = self.session.post('https://login.seek.com/passwordless/start', json=json_data)
+            # Remember the last login email so the poll below waits for the new one
+            previous_message_id = self.mail_client.last_message_id(self.SEEK_LOGIN_SENDER)
+            response = self._request('POST', f'{self.LOGIN_URL}/passwordless/start', json=json_data)
             response.raise_for_status()
-            logging.info("Waiting 5 seconds for login code email to arrive")
-            time.sleep(5)
+            logging.info("Waiting for login code email to arrive")
 
-            code = self.mail_client.fetch_code(self.SEEK_LOGIN_SENDER)
+            code = self.mail_client.wait_for_code(self.SEEK_LOGIN_SENDER, previous_message_id)
             json_data = {
                 'connection': 'email',
                 'verification_code': code,
@@ -91,7 +108,7 @@ class SeekClient:
                 'client_id': self.CLIENT_ID,
             }
 
-            response = self.session.post('https://login.seek.com/passwordless/verify', json=json_data)
+            response = self._request('POST', f'{self.LOGIN_URL}/passwordless/verify', json=json_data)
             response.raise_for_status()
             params = {
                 'client_id': self.CLIENT_ID,
@@ -107,7 +124,7 @@ class SeekClient:
                 'auth0Client': self.AUTH0_CLIENT,
             }
             
-            response = self.session.get('https://login.seek.com/passwordless/verify_redirect', params=params)
+            response = self._request('GET', f'{self.LOGIN_URL}/passwordless/verify_redirect', params=params)
             response.raise_for_status()
             auth_code = self._parse_auth_code(response.url)
 
@@ -122,7 +139,7 @@ class SeekClient:
                 'redirect_uri': 'https://www.seek.com.au/oauth/callback/',
             }
 
-            response = self.session.post('https://login.seek.com/oauth/token', json=json_data)
+            response = self._request('POST', f'{self.LOGIN_URL}/oauth/token', json=json_data)
             response.raise_for_status()
             data = response.json()
             self.refresh_token = data.get('refresh_token')
@@ -136,6 +153,26 @@ class SeekClient:
             logging.error(f"Error during login: {e}")
             return False
 
+    def _request(self, method, url, **kwargs):
+        """Send a request through the seek rate limiter, slowing down and retrying while seek responds 429."""
+        limiter = get_rate_limiter('seek')
+        payload = kwargs.get('json')
+        # Graphql calls are timed per operation, login calls per endpoint
+        operation = payload[0]['operationName'] if isinstance(payload, list) else urlparse(url).path
+        for _ in range(self.MAX_THROTTLE_RETRIES):
+            limiter.acquire_sync()
+            with METRICS.span(f'seek.{operation}'):
+                response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429:
+                limiter.succeeded()
+                return response
+            METRICS.count('seek.throttled')
+            limiter.throttled(response.headers.get('Retry-After'))
+
+        limiter.acquire_sync()
+        with METRICS.span(f'seek.{operation}'):
+            return self.session.request(method, url, **kwargs)
+
     def _check_and_renew(self):
         if not self.is_logged_in:
             success = self.login()
@@ -154,7 +191,7 @@ class SeekClient:
             'grant_type': 'refresh_token',
         }
         try:
-            response = self.session.post('https://login.seek.com/oauth/token', json=json_data)
+            response = self._request('POST', f'{self.LOGIN_URL}/oauth/token', json=json_data)
             response.raise_for_status()
             data = response.json()
 
@@ -214,7 +251,7 @@ class SeekClient:
                 },
             ]
 
-            response = self.session.post('https://www.seek.com.au/graphql', json=json_data)
+            response = self._request('POST', self.GRAPHQL_URL, json=json_data)
             # logging.info(f"Application response: {response.text}")
             response.raise_for_status()
             data = response.json()
@@ -226,6 +263,8 @@ class SeekClient:
             return False
 
     def _upload_attachment(self, type, file_path):
+        from requests_toolbelt import MultipartEncoder
+        from curl_cffi import requests
         try:
             actual_filename = os.path.basename(file_path)
             json_data = [
@@ -238,7 +277,7 @@ class SeekClient:
                 },
             ]
 
-            response = self.session.post('https://www.seek.com.au/graphql', json=json_data)
+            response = self._request('POST', self.GRAPHQL_URL, json=json_data)
             response.raise_for_status()
             response_data = response.json()
             document_form_data = response_data[0]['data']['viewer']['documentUploadFormData']
@@ -251,15 +290,15 @@ class SeekClient:
                 fields['file'] = (actual_filename, f, 'application/pdf')
                 mp = MultipartEncoder(fields=fields)
 
-                response = requests.post(
-                    link,
-                    data=mp.to_string(),
-                    headers={'Content-Type': mp.content_type}
-                    
-                )
+                with METRICS.span('seek.upload'):
+                    response = requests.post(
+                        link,
+                        data=mp.to_string(),
+                        headers={'Content-Type': mp.content_type}
+                        
+                    )
 
             response.raise_for_status()
-            time.sleep(5)
             
             if type == "CoverLetter":
                 json_data = self._process_cover_letter(uuid_key)
@@ -267,16 +306,20 @@ class SeekClient:
                 json_data = self._process_resume(uuid_key)
             else:
                 raise ValueError("Invalid attachment type")
-            
-            response = self.session.post('https://www.seek.com.au/graphql', json=json_data)
-            response.raise_for_status()
-            data = response.json()
-            if type == "CoverLetter":
-                uri = data[0]['data']['processUploadedAttachment']['uri']
-            elif type == "Resume":
-                uri = data[0]['data']['processUploadedResume']['resume']['fileMetadata']['uri']
-            
-            return uri
+
+            # The upload is processed asynchronously by seek, retry with backoff until it is available
+            for attempt in range(self.PROCESS_ATTEMPTS):
+                response = self._request('POST', self.GRAPHQL_URL, json=json_data)
+                response.raise_for_status()
+                data = response.json()
+                try:
+                    if type == "CoverLetter":
+                        return data[0]['data']['processUploadedAttachment']['uri']
+                    return data[0]['data']['processUploadedResume']['resume']['fileMetadata']['uri']
+                except (KeyError, TypeError, IndexError):
+                    if attempt == self.PROCESS_ATTEMPTS - 1:
+                        raise RuntimeError(f"Upload was not processed: {data}")
+                    time.sleep(0.5 * 2 ** attempt)
         except Exception as e:
             logging.error(f"Error during attachment upload: {e}")
             return None
@@ -330,7 +373,7 @@ class SeekClient:
                 },
             ]
 
-            response = self.session.post('https://www.seek.com.au/graphql', json=json_data)
+            response = self._request('POST', self.GRAPHQL_URL, json=json_data)
             # TODO: check response for errors as status always seems to be 200
             response.raise_for_status()
             data = response.json()
@@ -353,7 +396,7 @@ class SeekClient:
                 }
             ]
 
-            response = self.session.post('https://www.seek.com.au/graphql', json=json_data)
+            response = self._request('POST', self.GRAPHQL_URL, json=json_data)
             response.raise_for_status()
             # TODO: check response for errors as status always seems to be 200
             data = response.json()
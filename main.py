@@ -1,5 +1,8 @@
-from application_pipeline.job_application_pipeline import ApplicationPipeline
-from common.utils import load_json_file, extract_text_from_pdf
+import time
+STARTED_AT = time.perf_counter()
+
+from common.profiling import log_startup_report
+from common.utils import load_json_file
 from config.args import add_args
 from dotenv import load_dotenv
 from pathlib import Path
@@ -27,17 +30,21 @@ async def main():
     run_config = load_json_file(args.config_path)
     if not run_config:
         sys.exit(f"Aborting: {args.config_path} does not exist")
-    resume_txt = extract_text_from_pdf(args.resume_pdf_path)
-    args.resume_txt = resume_txt
-
     if os.getenv("OPENAI_KEY"):
         args.use_openai = True
     else:
         args.use_openai = False
         logging.warning("No openai api found defaulting to meta api")
 
+    # Imported after argument parsing so --help and bad arguments never pay for the pipeline's imports
+    from application_pipeline.job_application_pipeline import ApplicationPipeline
     pipeline = ApplicationPipeline(run_config, args)
+    if args.startup_report:
+        log_startup_report(STARTED_AT, "Startup")
+
     await pipeline.run()
+    if args.startup_report:
+        log_startup_report(STARTED_AT, "Run")
 
 if __name__ == "__main__":
     asyncio.run(main())
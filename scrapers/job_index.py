@@ -0,0 +1,38 @@
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class JobIndex:
+    """Job-id keyed index of every listing scraped in a run, across all search terms."""
+    def __init__(self):
+        self.terms = {}
+        self.total_seen = 0
+
+    def merge(self, searchTerm, jobs):
+        """Record jobs returned for searchTerm and return only the ones not seen under an earlier term."""
+        unique_jobs = []
+        for job in jobs:
+            self.total_seen += 1
+            job_id = job.get('id')
+            if job_id is None:
+                continue
+
+            if job_id in self.terms:
+                if searchTerm not in self.terms[job_id]:
+                    self.terms[job_id].append(searchTerm)
+                continue
+
+            self.terms[job_id] = [searchTerm]
+            job['searchTerms'] = self.terms[job_id]
+            unique_jobs.append(job)
+
+        return unique_jobs
+
+    def __len__(self):
+        return len(self.terms)
+
+    def log_summary(self):
+        logging.info(f"Scraped {self.total_seen} listings, {len(self)} unique across all search terms")
@@ -0,0 +1,114 @@
+from common.utils import load_json_file, write_json_file
+from datetime import datetime, timedelta
+from pathlib import Path
+import hashlib
+import logging
+import json
+import gzip
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class ScrapeCache:
+    """
+    Content addressed on-disk cache of apify datasets, keyed by a hash of the search term and run input.
+    Datasets are stored as gzipped json lines next to an index.json describing each entry.
+    """
+    def __init__(self, cache_dir, ttl_hours):
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / "index.json"
+        self.ttl = timedelta(hours=ttl_hours)
+        self.index = load_json_file(self.index_path) if self.index_path.exists() else {}
+
+    @staticmethod
+    def key(searchTerm, run_input):
+        payload = json.dumps({'searchTerm': searchTerm, 'run_input': run_input}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key, since=None):
+        """Return key if it has a cached dataset younger than the ttl and, if given, created after since."""
+        entry = self.index.get(key)
+        if not entry or not self._path(key).exists():
+            return None
+        created_at = datetime.fromisoformat(entry['created_at'])
+        if datetime.now() - created_at > self.ttl:
+            return None
+        if since and created_at.astimezone() <= since:
+            return None
+        return key
+
+    def latest(self, searchTerm):
+        """Return the key of the newest cached dataset for searchTerm regardless of age, used for replay."""
+        entries = [
+            (entry['created_at'], key) for key, entry in self.index.items()
+            if entry['searchTerm'] == searchTerm and self._path(key).exists()
+        ]
+        return max(entries)[1] if entries else None
+
+    def read(self, key, page_size):
+        """Yield the cached dataset in pages of page_size items."""
+        page = []
+        with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+            for line in f:
+                page.append(json.loads(line))
+                if len(page) == page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    def writer(self, key, searchTerm, run_input):
+        return ScrapeCacheWriter(self, key, searchTerm, run_input)
+
+    def _commit(self, key, searchTerm, run_input, tmp_path, items):
+        os.replace(tmp_path, self._path(key))
+        self.index[key] = {
+            'searchTerm': searchTerm,
+            'run_input': run_input,
+            'created_at': datetime.now().isoformat(),
+            'items': items,
+        }
+        self._prune()
+        write_json_file(self.index_path, self.index)
+        logging.info(f"Cached {items} jobs for search term: {searchTerm}")
+
+    def _prune(self):
+        """Drop expired entries, keeping the newest per search term so it can still be replayed."""
+        keep = {self.latest(entry['searchTerm']) for entry in self.index.values()}
+        for key, entry in list(self.index.items()):
+            expired = datetime.now() - datetime.fromisoformat(entry['created_at']) > self.ttl
+            if expired and key not in keep:
+                self._path(key).unlink(missing_ok=True)
+                del self.index[key]
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.jsonl.gz"
+
+
+class ScrapeCacheWriter:
+    """Streams dataset pages to a temporary file, only committed to the cache once the whole dataset was read."""
+    def __init__(self, cache, key, searchTerm, run_input):
+        self.cache = cache
+        self.key = key
+        self.searchTerm = searchTerm
+        self.run_input = run_input
+        self.items = 0
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        self.tmp_path = cache.cache_dir / f"{key}.jsonl.gz.tmp"
+        self.file = gzip.open(self.tmp_path, 'wt', encoding='utf-8')
+
+    def write(self, jobs):
+        for job in jobs:
+            self.file.write(json.dumps(job, separators=(',', ':')) + "\n")
+        self.items += len(jobs)
+
+    def commit(self):
+        self.file.close()
+        self.cache._commit(self.key, self.searchTerm, self.run_input, self.tmp_path, self.items)
+
+    def discard(self):
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,81 @@
+from common.utils import load_json_file, write_json_file
+from datetime import datetime, timedelta, timezone
+import logging
+import math
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+
+class ScrapeState:
+    """
+    Per search term high-water marks persisted between runs so scheduled runs only scrape the delta.
+    For each term we keep the newest listing date seen and the ids of every listing inside the
+    configured dateRange window, older ids can never be returned again and are pruned on save.
+    """
+    LISTED_DATE_FIELD = 'listedAt'
+
+    def __init__(self, path, max_date_range):
+        self.path = path
+        self.max_date_range = max_date_range
+        state = load_json_file(path)
+        self.terms = state.get('terms', {})
+        # When the last run finished, datasets scraped before then were already filtered by it
+        self.saved_at = self._parse_date(state.get('saved_at'))
+
+    def date_range(self, searchTerm):
+        """Days of listings to request for searchTerm, shrunk to cover only the time since the last run."""
+        high_water_mark = self._parse_date(self.terms.get(searchTerm, {}).get('high_water_mark'))
+        if not high_water_mark:
+            return self.max_date_range
+
+        # Overlap by a day as seek only filters by whole days, already seen ids are dropped in filter_new
+        days_since = (datetime.now(timezone.utc) - high_water_mark).total_seconds() / 86400
+        return max(1, min(self.max_date_range, math.ceil(days_since) + 1))
+
+    def filter_new(self, searchTerm, jobs):
+        """Return jobs not seen for searchTerm in earlier runs."""
+        seen = self.terms.get(searchTerm, {}).get('seen', {})
+        return [job for job in jobs if job.get('id') not in seen]
+
+    def mark_seen(self, searchTerm, jobs):
+        """
+        Record jobs as seen for searchTerm and advance its high-water mark. Called once jobs have been
+        scored, so a page that fails part way through the pipeline is scraped again by the next run.
+        """
+        state = self.terms.setdefault(searchTerm, {'high_water_mark': None, 'seen': {}})
+        high_water_mark = self._parse_date(state['high_water_mark'])
+        for job in jobs:
+            listed_at = self._parse_date(job.get(self.LISTED_DATE_FIELD)) or datetime.now(timezone.utc)
+            state['seen'][job.get('id')] = listed_at.isoformat()
+            if not high_water_mark or listed_at > high_water_mark:
+                high_water_mark = listed_at
+
+        if high_water_mark:
+            state['high_water_mark'] = high_water_mark.isoformat()
+
+    def save(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_date_range)
+        for searchTerm, state in self.terms.items():
+            state['seen'] = {
+                job_id: listed_at for job_id, listed_at in state['seen'].items()
+                if self._parse_date(listed_at) >= cutoff
+            }
+            logging.info(f"Search term {searchTerm} high-water mark {state['high_water_mark']}, tracking {len(state['seen'])} seen jobs")
+
+        self.saved_at = datetime.now(timezone.utc)
+        write_json_file(self.path, {'terms': self.terms, 'saved_at': self.saved_at.isoformat()})
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        try:
+            date = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return date
@@ -1,5 +1,5 @@
-
-from apify_client import ApifyClientAsync
+from common.utils import retry_async
+from common.metrics import METRICS
 from dotenv import load_dotenv
 import logging
 import asyncio
@@ -12,32 +12,157 @@ logging.basicConfig(
 )
 
 class JobScraper:
-    def __init__(self, run_config):
+    def __init__(self, run_config, page_size=100, state=None, cache=None, replay=False, concurrency=5, retries=3):
         self.run_config = run_config
-        self.client = ApifyClientAsync(os.getenv("APIFY_KEY"))
-        
+        self.page_size = page_size
+        self.state = state
+        self.cache = cache
+        self.replay = replay
+        self.retries = retries
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.term_status = {}
+        self._client = None
+
+    @property
+    def client(self):
+        # apify_client is imported on first use so replays never load it
+        if self._client is None:
+            from apify_client import ApifyClientAsync
+            self._client = ApifyClientAsync(os.getenv("APIFY_KEY"), api_url=os.getenv("APIFY_API_URL"))
+        return self._client
+
     async def scrape(self, actor):
+        """
+        Yield (searchTerm, jobs) pages as soon as each search term's actor run has finished.
+        A term's dataset is read page_size items at a time so only one page is held in memory.
+        """
+        self.term_status = {
+            query: {'status': 'pending', 'attempts': 0, 'jobs': 0, 'error': None}
+            for query in self.run_config['searchTerms']
+        }
+        tasks = [
+            asyncio.ensure_future(self._run_actor(actor, query))
+            for query in self.run_config['searchTerms']
+        ]
         try:
-            all_data = {}
-            tasks = []
-            searchTerms = []
-            for query in self.run_config['searchTerms']:
-                config = {k: v for k, v in self.run_config.items() if k != 'searchTerms'}
-                config['searchTerm'] = query
-                searchTerms.append(query)
-                tasks.append(self.client.actor(actor).call(run_input=config))
-            
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            for searchTerm, response in zip(searchTerms, responses):
-                if isinstance(response, Exception):
+            for task in asyncio.as_completed(tasks):
+                searchTerm, run_input, source = await task
+                if not source:
                     continue
-                all_data[searchTerm] = await self._get_dataset(response)
 
-            return all_data
+                status = self.term_status[searchTerm]
+                try:
+                    async for jobs in self._get_pages(searchTerm, run_input, source):
+                        status['jobs'] += len(jobs)
+                        if self.state:
+                            jobs = self.state.filter_new(searchTerm, jobs)
+                            if not jobs:
+                                continue
+                        yield searchTerm, jobs
+                except Exception as e:
+                    logging.error(f"Error reading dataset for search term {searchTerm}: {e}")
+                    status['status'] = 'failed'
+                    status['error'] = f"dataset read: {e}"
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.log_status()
+
+    def log_status(self):
+        for searchTerm, status in self.term_status.items():
+            message = f"Search term {searchTerm}: {status['status']} after {status['attempts']} attempt(s), {status['jobs']} jobs"
+            if status['status'] == 'failed':
+                logging.error(f"{message}, error: {status['error']}")
+            else:
+                logging.info(message)
+
+    async def _run_actor(self, actor, searchTerm):
+        """Return (searchTerm, run_input, source) where source is a cache key or a finished actor run."""
+        status = self.term_status[searchTerm]
+        config = {k: v for k, v in self.run_config.items() if k != 'searchTerms'}
+        config['searchTerm'] = searchTerm
+        if self.replay:
+            cached = self.cache.latest(searchTerm)
+            if not cached:
+                logging.warning(f"No cached dataset to replay for search term: {searchTerm}")
+            status['status'] = 'replayed' if cached else 'missing'
+            return searchTerm, config, cached
+
+        if self.state:
+            config['dateRange'] = self.state.date_range(searchTerm)
+            logging.info(f"Scraping last {config['dateRange']} days of listings for search term: {searchTerm}")
+
+        if self.cache:
+            # Only datasets from a run that never finished are reused, a finished run already filtered them
+            # and as dateRange rarely changes between scheduled runs their key would hide every newer listing
+            cached = self.cache.get(self.cache.key(searchTerm, config), self.state.saved_at if self.state else None)
+            if cached:
+                logging.info(f"Using cached dataset for search term: {searchTerm}")
+                status['status'] = 'cached'
+                return searchTerm, config, cached
+
+        async def call():
+            # Bound concurrent actor runs to stay under the account's concurrency limit, backoff happens outside it
+            async with self.semaphore:
+                status['attempts'] += 1
+                with METRICS.span('scrape.actor_run'):
+                    run = await self.client.actor(actor).call(run_input=config)
+            if not run or run.get('status') != 'SUCCEEDED':
+                raise RuntimeError(f"actor run finished with status {run.get('status') if run else None}")
+            return run
+
+        try:
+            run = await retry_async(call, self.retries, description=f"Actor run for search term {searchTerm}")
         except Exception as e:
-            logging.error(e)
-            return []
+            logging.error(f"Error scraping search term {searchTerm}: {e}")
+            status['status'] = 'failed'
+            status['error'] = str(e)
+            return searchTerm, config, None
+
+        status['status'] = 'succeeded'
+        return searchTerm, config, run
+
+    def mark_seen(self, searchTerm, jobs):
+        """Record jobs as processed so incremental runs do not scrape them again."""
+        if self.state:
+            self.state.mark_seen(searchTerm, jobs)
+
+    def save_state(self):
+        """Persist high-water marks, only call once every scraped job has been processed."""
+        if self.state:
+            self.state.save()
+
+    async def _get_pages(self, searchTerm, run_input, source):
+        if isinstance(source, str):
+            for jobs in self.cache.read(source, self.page_size):
+                yield jobs
+            return
+
+        if not self.cache:
+            async for jobs in self._get_dataset(source):
+                yield jobs
+            return
+
+        # Tee pages into the cache while they stream, a partially read dataset is never committed
+        writer = self.cache.writer(self.cache.key(searchTerm, run_input), searchTerm, run_input)
+        try:
+            async for jobs in self._get_dataset(source):
+                writer.write(jobs)
+                yield jobs
+        except BaseException:
+            writer.discard()
+            raise
+        writer.commit()
 
     async def _get_dataset(self, run):
-        data = await self.client.dataset(run["defaultDatasetId"]).list_items()
-        return data.items
\ No newline at end of file
+        dataset = self.client.dataset(run["defaultDatasetId"])
+        offset = 0
+        while True:
+            with METRICS.span('scrape.dataset_page'):
+                page = await dataset.list_items(offset=offset, limit=self.page_size)
+            if page.items:
+                yield page.items
+
+            offset += page.count
+            if page.count < self.page_size or offset >= page.total:
+                break